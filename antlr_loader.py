@@ -0,0 +1,73 @@
+from antlr4 import *
+from gramLexer import gramLexer
+from gramListener import gramListener
+from gramParser import gramParser
+from models import TemporaryModel
+
+class gramPrintListener(gramListener):
+    def __init__(self, model):
+        self.model = model
+
+    def enterDefstates(self, ctx):
+        if ctx.state_reward_list() is not None:
+            rewards = {}
+            for sr in ctx.state_reward_list().state_reward():
+                state = sr.ID().getText()  
+                reward_val = int(sr.INT().getText()) 
+                rewards[state] = reward_val
+            self.model.add_states(None, rewards)
+        elif ctx.state_list() is not None:
+            id_tokens = ctx.state_list().getTokens(gramParser.ID)
+            self.model.add_states([token.getText() for token in id_tokens])
+
+            
+    def enterDeffamily(self, ctx):
+        for family in ctx.family():
+            ints = [int(x.getText()) for x in family.INT()]
+            reward = ints[2] if len(ints) > 2 else None
+            self.model.add_family(family.ID().getText(), ints[0], ints[1], reward, ctx.start.line)
+
+    def enterDefactions(self, ctx):
+        self.model.add_actions([x.getText() for x in ctx.ID()])
+
+    def enterTransact(self, ctx):
+        ids = [x.getText() for x in ctx.ID()]
+        dep = ids.pop(0)
+        act = ids.pop(0)
+        weights = [int(x.getText()) for x in ctx.INT()]
+        self.model.add_transitions(dep, act, ids, weights, ctx.start.line)
+
+    def enterTransnoact(self, ctx):
+        ids = [x.getText() for x in ctx.ID()]
+        dep = ids.pop(0)
+        weights = [int(x.getText()) for x in ctx.INT()]
+        self.model.add_transitions(dep, None, ids, weights, ctx.start.line)
+
+    def enterTranstemplate(self, ctx):
+        ids = [x.getText() for x in ctx.ID()]
+        family = ids.pop(0)
+        variable = ids.pop(0)
+        act = ids.pop(0) if ids else None
+        ints = [int(x.getText()) for x in ctx.INT()]
+        first, last = ints[0], ints[1]
+        targets = []
+        for target in ctx.target():
+            if target.LCROCH() is None:
+                targets.append((target.ID(0).getText(), None))
+                continue
+            if target.ID(1).getText() != variable:
+                raise Exception(f"Error: line {ctx.start.line}: unknown index variable, expected '{variable}'")
+            offset = int(target.INT().getText()) if target.INT() is not None else 0
+            targets.append((target.ID(0).getText(), -offset if target.MINUS() is not None else offset))
+        self.model.add_template(family, first, last, act, targets, ints[2:], ctx.start.line)
+
+def load_temporary_model(filename):
+    lexer = gramLexer(FileStream(filename))
+    stream = CommonTokenStream(lexer)
+    parser = gramParser(stream)
+    tree = parser.program()
+    temp_model = TemporaryModel()
+    printer = gramPrintListener(temp_model)
+    walker = ParseTreeWalker()
+    walker.walk(printer, tree)
+    return temp_model
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import cache
+import loader
+import storage
+from models import MarkovDecisionProcess
+from solvers import ITERATIONS, METHODS
+
+# headless commands: no prompt, no plot, one JSON document on stdout
+COMMANDS = ('simulate', 'check', 'reward', 'learn')
+TECHNIQUES = ('linear', 'iterative', 'interval', 'value', 'policy', 'smc', 'qualitative', 'adaptive', 'importance')
+
+
+def load(path, no_cache=False):
+    if os.path.isdir(path):
+        return loader.load_shards([path]).generate_model()
+    if path.endswith('.bin'):
+        return storage.open_model(path)
+    if no_cache:
+        return loader.load_model(path)
+    return cache.load_model(path)
+
+
+def simulate(model, args):
+    paths = []
+    for _ in range(args.runs):
+        if isinstance(model, MarkovDecisionProcess):
+            actions = model.simulation_init()
+            path = [{'state': model.actual_state}]
+            for _ in range(args.steps):
+                action = sorted(actions)[model.rng.integers(len(actions))]
+                state, actions = model.simulation_step(action)
+                path.append({'action': action, 'state': state})
+        else:
+            model.simulation_init()
+            path = [model.actual_state] + [model.simulation_step() for _ in range(args.steps)]
+        paths.append(path)
+    return [{'query': {'steps': args.steps, 'runs': args.runs}, 'result': paths}]
+
+
+def check(model, args, property):
+    if isinstance(model, MarkovDecisionProcess):
+        if args.technique not in ('linear', 'interval', 'value', 'policy'):
+            raise Exception(f'Error: technique {args.technique} is only available for Markov chains')
+        if args.technique == 'linear':
+            return model.verify_property_linear(property, args.minimum)
+        if args.technique != 'interval':
+            probabilities, scheduler, report = model.solve_property_optimal(
+                property, args.technique, args.minimum, args.tolerance, args.relative, args.max_iterations, args.solver)
+            return {'probabilities': probabilities, 'scheduler': scheduler, **report}
+    elif args.technique in ('value', 'policy'):
+        raise Exception(f'Error: technique {args.technique} needs a Markov decision process')
+    if args.technique == 'interval':
+        bounds, report = model.solve_property_interval(property, args.tolerance, args.relative, args.max_iterations,
+                                                       args.minimum)
+        low, high = bounds[args.initial or model.states[0]]
+        return {'probability': (low + high) / 2, 'interval': [low, high], **report}
+    if args.technique == 'linear':
+        return model.verify_property_linear_system(property, args.solver)
+    if args.technique == 'iterative':
+        probabilities, report = model.solve_property_iterative(
+            property, args.tolerance, args.max_iterations, args.iteration, args.omega, args.relative)
+        return {'probability': probabilities[args.initial or model.states[0]], **report}
+    if args.technique == 'smc':
+        return model.verify_property_smc_quant(property, args.epsilon, args.delta, args.steps, args.workers, args.seed)
+    if args.technique == 'qualitative':
+        answer, samples = model.verify_property_smc_qual(property, args.theta, args.epsilon)
+        return {'below_theta': {1: True, 0: False}.get(answer), 'simulations': samples}
+    if args.technique == 'adaptive':
+        probability, (low, high), samples = model.verify_property_smc_adaptive(property, args.epsilon, args.delta, args.steps)
+        return {'probability': probability, 'interval': [low, high], 'simulations': samples}
+    probability, (low, high), variance = model.verify_property_smc_importance(property, args.paths, args.delta, args.steps)
+    return {'probability': probability, 'interval': [low, high], 'variance': variance}
+
+
+def reward(model, query):
+    if isinstance(model, MarkovDecisionProcess):
+        raise Exception('Error: the expected reward is only available for Markov chains')
+    initial, target = query.split(':')
+    return model.expected_reward_MC(initial, target)
+
+
+def learn(model, args):
+    if not isinstance(model, MarkovDecisionProcess):
+        raise Exception('Error: reinforcement learning needs a Markov decision process')
+    Q = model.q_learning(args.gamma, args.episodes).reshape(len(model.states), len(model.actions))
+    return [{'query': {'gamma': args.gamma, 'episodes': args.episodes},
+             'result': {state: dict(zip(model.actions, Q[i].tolist())) for i, state in enumerate(model.states)}}]
+
+
+def timed(query, function, *arguments):
+    start = time.perf_counter()
+    try:
+        entry = {'query': query, 'result': function(*arguments)}
+    except KeyError as e:
+        entry = {'query': query, 'error': f'Error: unknown state or action: {e.args[0]}'}
+    except Exception as e:
+        entry = {'query': query, 'error': str(e)}
+    entry['seconds'] = time.perf_counter() - start
+    return entry
+
+
+def run(path, args):
+    report = {'model': path}
+    start = time.perf_counter()
+    try:
+        model = load(path, args.no_cache)
+    except Exception as e:
+        report['error'] = str(e)
+        return report
+    report['load_seconds'] = time.perf_counter() - start
+    report['type'] = 'MDP' if isinstance(model, MarkovDecisionProcess) else 'MC'
+    report['states'] = len(model.states)
+    model.simulation_trace = False
+    model.rng = np.random.default_rng(args.seed)
+
+    if args.command == 'check':
+        report['results'] = [timed({'property': p, 'technique': args.technique}, check, model, args, p)
+                             for p in args.property]
+    elif args.command == 'reward':
+        report['results'] = [timed({'reward': q}, reward, model, q) for q in args.query]
+    else:
+        start = time.perf_counter()
+        try:
+            report['results'] = simulate(model, args) if args.command == 'simulate' else learn(model, args)
+        except KeyError as e:
+            report['error'] = f'Error: unknown state or action: {e.args[0]}'
+        except Exception as e:
+            report['error'] = str(e)
+        report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def parser():
+    parser = argparse.ArgumentParser(prog='mdp.py', description='Run queries on models without prompts or plots.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def command(name, help):
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument('models', nargs='+', help='.mdp, .bin files or directories of shards')
+        sub.add_argument('--seed', type=int, default=None)
+        sub.add_argument('--no-cache', action='store_true')
+        sub.add_argument('--output', help='write the JSON report to this file instead of stdout')
+        return sub
+
+    sub = command('simulate', 'random runs (random actions for an MDP)')
+    sub.add_argument('--steps', type=int, default=10)
+    sub.add_argument('--runs', type=int, default=1)
+
+    sub = command('check', 'probability of reaching the given states')
+    sub.add_argument('--property', action='append', required=True, help='target state(s), repeat for several queries')
+    sub.add_argument('--technique', choices=TECHNIQUES, default='linear')
+    sub.add_argument('--solver', choices=METHODS, default='auto',
+                     help='linear system solver of the linear and policy techniques')
+    sub.add_argument('--initial', help='initial state of the iterative and interval techniques')
+    sub.add_argument('--iteration', choices=ITERATIONS, default='jacobi', help='scheme of the iterative technique')
+    sub.add_argument('--omega', type=float, default=1.0, help='relaxation factor of sor')
+    sub.add_argument('--relative', action='store_true', help='relative instead of absolute convergence criterion')
+    sub.add_argument('--tolerance', type=float, default=1e-4,
+                     help='convergence threshold of the iterative and value techniques, largest gap of the interval technique')
+    sub.add_argument('--minimum', action='store_true', help='minimum instead of maximum probability of an MDP')
+    sub.add_argument('--max-iterations', type=int, default=10000)
+    sub.add_argument('--epsilon', type=float, default=0.01)
+    sub.add_argument('--delta', type=float, default=0.01)
+    sub.add_argument('--theta', type=float, default=0.5)
+    sub.add_argument('--steps', type=int, default=20)
+    sub.add_argument('--paths', type=int, default=10000)
+    sub.add_argument('--workers', type=int, default=None,
+                     help='processes simulating the smc technique, same result as one process for a given --seed')
+
+    sub = command('reward', 'expected reward of a Markov chain')
+    sub.add_argument('--query', action='append', required=True, help='INITIAL:TARGET, repeat for several queries')
+
+    sub = command('learn', 'Q-learning on a Markov decision process')
+    sub.add_argument('--gamma', type=float, default=0.5)
+    sub.add_argument('--episodes', type=int, default=10000)
+    return parser
+
+
+def encode(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    start = time.perf_counter()
+    reports = [run(path, args) for path in args.models]
+    document = json.dumps({'command': args.command, 'models': reports, 'seconds': time.perf_counter() - start},
+                          default=encode)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+    failed = any('error' in report or any('error' in entry for entry in report.get('results', [])) for report in reports)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
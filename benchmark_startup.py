@@ -0,0 +1,54 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# modules that only the interactive plots, the ANTLR parser or the MDP solver may import
+HEAVY = ('matplotlib', 'graphviz', 'antlr4', 'scipy.optimize', 'scipy.stats')
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def wall_times(command, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Startup time of a batch reachability query.')
+    parser.add_argument('--model', default=os.path.join('models', 'mc.mdp'))
+    parser.add_argument('--property', default='S2')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--ratio', type=float, default=3.5,
+                        help='maximum median time, as a multiple of the median time of import numpy')
+    parser.add_argument('--target', type=float, default=None, help='maximum median time in milliseconds, instead of --ratio')
+    args = parser.parse_args(argv)
+
+    check = 'import sys, mdp; print(" ".join(m for m in %r if m in sys.modules))' % (HEAVY,)
+    eager = subprocess.run([sys.executable, '-c', check], cwd=HERE, check=True, capture_output=True, text=True).stdout.split()
+
+    interpreter = wall_times([sys.executable, '-c', 'pass'], args.repeat)
+    numpy = wall_times([sys.executable, '-c', 'import numpy'], args.repeat)
+    query = wall_times([sys.executable, 'batch.py', 'check', args.model, '--property', args.property, '--no-cache'], args.repeat)
+    for name, times in (('interpreter', interpreter), ('import numpy', numpy), ('check query', query)):
+        print(f'{name:>14}: median {statistics.median(times):7.1f} ms, min {min(times):7.1f} ms')
+
+    failed = False
+    if eager:
+        print(f'imported at startup: {", ".join(eager)}')
+        failed = True
+    # numpy alone takes most of the time, and its import time follows the speed of the machine
+    target = args.target if args.target is not None else args.ratio * statistics.median(numpy)
+    if statistics.median(query) > target:
+        print(f'check query slower than {target:.0f} ms')
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
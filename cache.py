@@ -0,0 +1,102 @@
+import hashlib
+import os
+import numpy as np
+import loader
+from models import CompiledModel, MarkovChain, MarkovDecisionProcess
+
+# bump whenever the layout of the cached arrays or their meaning changes
+FORMAT_VERSION = 2
+CACHE_DIRECTORY = '__mdpcache__'
+
+
+def source_hash(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(filename, digest):
+    directory = os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIRECTORY)
+    return os.path.join(directory, f'{os.path.basename(filename)}.{digest[:16]}.v{FORMAT_VERSION}.npz')
+
+
+def save_compiled(path, model, digest):
+    compiled = model.compiled
+    arrays = {
+        'format_version': np.array(FORMAT_VERSION),
+        'source_hash': np.array(digest),
+        'states': np.array(compiled.states, dtype=str),
+        'actions': np.array(compiled.actions, dtype=str),
+        'indptr': compiled.indptr,
+        'indices': compiled.indices,
+        'weights': compiled.weights,
+        'alias_probability': compiled.alias_probability,
+        'alias': compiled.alias,
+        'rewards': np.array([model.state_rewards.get(state, 0) for state in compiled.states], dtype=np.int64),
+        'rewarded': np.array([state in model.state_rewards for state in compiled.states], dtype=bool),
+    }
+    if compiled.choice_offsets is not None:
+        arrays['choice_offsets'] = compiled.choice_offsets
+        arrays['choice_actions'] = compiled.choice_actions
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(temporary, **arrays)
+    os.replace(temporary, path)
+
+
+def load_compiled(path, digest):
+    with np.load(path, allow_pickle=False) as data:
+        if int(data['format_version']) != FORMAT_VERSION or str(data['source_hash']) != digest:
+            return None
+        states = data['states'].tolist()
+        compiled = CompiledModel(
+            states,
+            data['actions'].tolist(),
+            data['indptr'],
+            data['indices'],
+            data['weights'],
+            data['choice_offsets'] if 'choice_offsets' in data else None,
+            data['choice_actions'] if 'choice_actions' in data else None,
+            data['alias_probability'],
+            data['alias'])
+        rewarded = data['rewarded']
+        rewards = {states[i]: reward for i, reward in zip(np.flatnonzero(rewarded).tolist(),
+                                                          data['rewards'][rewarded].tolist())}
+    model_class = MarkovChain if compiled.choice_offsets is None else MarkovDecisionProcess
+    return model_class.from_compiled(compiled, rewards)
+
+
+def remove_stale(filename, keep):
+    directory = os.path.dirname(keep)
+    if not os.path.isdir(directory):
+        return
+    prefix = os.path.basename(filename) + '.'
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        # '.tmp.' files are being written by another process, which renames them when done
+        if entry.startswith(prefix) and entry.endswith('.npz') and '.tmp.' not in entry and path != keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def load_model(filename, load_temporary_model=loader.load_temporary_model):
+    digest = source_hash(filename)
+    path = cache_path(filename, digest)
+    if os.path.exists(path):
+        try:
+            model = load_compiled(path, digest)
+        except (OSError, ValueError, KeyError):
+            model = None
+        if model is not None:
+            return model
+    model = load_temporary_model(filename).generate_model()
+    try:
+        remove_stale(filename, path)
+        save_compiled(path, model, digest)
+    except OSError:
+        pass
+    return model
@@ -1,6 +1,6 @@
 grammar gram;
 
-program : defstates defactions? transitions EOF;
+program : (defstates | deffamily)+ defactions? transitions EOF;
 
 defstates : STATES (state_reward_list | state_list) SEMI;
 
@@ -10,16 +10,26 @@ state_reward : ID DPOINT INT;
 
 state_list : ID (VIRG ID)*;
 
+// Q[0..N] declares the states Q_0 ... Q_N
+deffamily : STATES family (VIRG family)* SEMI;
+
+family : ID LCROCH INT RANGE INT RCROCH (DPOINT INT)?;
+
 defactions : ACTIONS ID (VIRG ID)* SEMI;
 
 transitions : trans+;
 
-trans : transact | transnoact;
+trans : transact | transnoact | transtemplate;
 
 transact : ID LCROCH ID RCROCH FLECHE INT DPOINT ID (PLUS INT DPOINT ID)* SEMI;
 
 transnoact : ID FLECHE INT DPOINT ID (PLUS INT DPOINT ID)* SEMI;
 
+// Q[i=1..N][a] -> 1:Q[i+1] + 2:Q[i-1] + 3:ERR; one transition per index of the range
+transtemplate : ID LCROCH ID EQ INT RANGE INT RCROCH (LCROCH ID RCROCH)? FLECHE INT DPOINT target (PLUS INT DPOINT target)* SEMI;
+
+target : ID | ID LCROCH ID ((PLUS | MINUS) INT)? RCROCH;
+
 // Lexer rules
 STATES    : 'States';
 ACTIONS   : 'Actions';
@@ -30,6 +40,9 @@ VIRG      : ',';
 PLUS      : '+';
 LCROCH    : '[';
 RCROCH    : ']';
+RANGE     : '..';
+EQ        : '=';
+MINUS     : '-';
 
 INT       : [0-9]+;
 ID        : [a-zA-Z_][a-zA-Z_0-9]*;
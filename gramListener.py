@@ -53,6 +53,24 @@ class gramListener(ParseTreeListener):
         pass
 
 
+    # Enter a parse tree produced by gramParser#deffamily.
+    def enterDeffamily(self, ctx:gramParser.DeffamilyContext):
+        pass
+
+    # Exit a parse tree produced by gramParser#deffamily.
+    def exitDeffamily(self, ctx:gramParser.DeffamilyContext):
+        pass
+
+
+    # Enter a parse tree produced by gramParser#family.
+    def enterFamily(self, ctx:gramParser.FamilyContext):
+        pass
+
+    # Exit a parse tree produced by gramParser#family.
+    def exitFamily(self, ctx:gramParser.FamilyContext):
+        pass
+
+
     # Enter a parse tree produced by gramParser#defactions.
     def enterDefactions(self, ctx:gramParser.DefactionsContext):
         pass
@@ -98,5 +116,23 @@ class gramListener(ParseTreeListener):
         pass
 
 
+    # Enter a parse tree produced by gramParser#transtemplate.
+    def enterTranstemplate(self, ctx:gramParser.TranstemplateContext):
+        pass
+
+    # Exit a parse tree produced by gramParser#transtemplate.
+    def exitTranstemplate(self, ctx:gramParser.TranstemplateContext):
+        pass
+
+
+    # Enter a parse tree produced by gramParser#target.
+    def enterTarget(self, ctx:gramParser.TargetContext):
+        pass
+
+    # Exit a parse tree produced by gramParser#target.
+    def exitTarget(self, ctx:gramParser.TargetContext):
+        pass
+
+
 
 del gramParser
\ No newline at end of file
@@ -10,39 +10,67 @@ else:
 
 def serializedATN():
     return [
-        4,1,12,110,2,0,7,0,2,1,7,1,2,2,7,2,2,3,7,3,2,4,7,4,2,5,7,5,2,6,7,
-        6,2,7,7,7,2,8,7,8,2,9,7,9,1,0,1,0,3,0,23,8,0,1,0,1,0,1,0,1,1,1,1,
-        1,1,3,1,31,8,1,1,1,1,1,1,2,1,2,1,2,5,2,38,8,2,10,2,12,2,41,9,2,1,
-        3,1,3,1,3,1,3,1,4,1,4,1,4,5,4,50,8,4,10,4,12,4,53,9,4,1,5,1,5,1,
-        5,1,5,5,5,59,8,5,10,5,12,5,62,9,5,1,5,1,5,1,6,4,6,67,8,6,11,6,12,
-        6,68,1,7,1,7,3,7,73,8,7,1,8,1,8,1,8,1,8,1,8,1,8,1,8,1,8,1,8,1,8,
-        1,8,1,8,5,8,87,8,8,10,8,12,8,90,9,8,1,8,1,8,1,9,1,9,1,9,1,9,1,9,
-        1,9,1,9,1,9,1,9,5,9,103,8,9,10,9,12,9,106,9,9,1,9,1,9,1,9,0,0,10,
-        0,2,4,6,8,10,12,14,16,18,0,0,108,0,20,1,0,0,0,2,27,1,0,0,0,4,34,
-        1,0,0,0,6,42,1,0,0,0,8,46,1,0,0,0,10,54,1,0,0,0,12,66,1,0,0,0,14,
-        72,1,0,0,0,16,74,1,0,0,0,18,93,1,0,0,0,20,22,3,2,1,0,21,23,3,10,
-        5,0,22,21,1,0,0,0,22,23,1,0,0,0,23,24,1,0,0,0,24,25,3,12,6,0,25,
-        26,5,0,0,1,26,1,1,0,0,0,27,30,5,1,0,0,28,31,3,4,2,0,29,31,3,8,4,
-        0,30,28,1,0,0,0,30,29,1,0,0,0,31,32,1,0,0,0,32,33,5,5,0,0,33,3,1,
-        0,0,0,34,39,3,6,3,0,35,36,5,6,0,0,36,38,3,6,3,0,37,35,1,0,0,0,38,
-        41,1,0,0,0,39,37,1,0,0,0,39,40,1,0,0,0,40,5,1,0,0,0,41,39,1,0,0,
-        0,42,43,5,11,0,0,43,44,5,3,0,0,44,45,5,10,0,0,45,7,1,0,0,0,46,51,
-        5,11,0,0,47,48,5,6,0,0,48,50,5,11,0,0,49,47,1,0,0,0,50,53,1,0,0,
-        0,51,49,1,0,0,0,51,52,1,0,0,0,52,9,1,0,0,0,53,51,1,0,0,0,54,55,5,
-        2,0,0,55,60,5,11,0,0,56,57,5,6,0,0,57,59,5,11,0,0,58,56,1,0,0,0,
-        59,62,1,0,0,0,60,58,1,0,0,0,60,61,1,0,0,0,61,63,1,0,0,0,62,60,1,
-        0,0,0,63,64,5,5,0,0,64,11,1,0,0,0,65,67,3,14,7,0,66,65,1,0,0,0,67,
-        68,1,0,0,0,68,66,1,0,0,0,68,69,1,0,0,0,69,13,1,0,0,0,70,73,3,16,
-        8,0,71,73,3,18,9,0,72,70,1,0,0,0,72,71,1,0,0,0,73,15,1,0,0,0,74,
-        75,5,11,0,0,75,76,5,8,0,0,76,77,5,11,0,0,77,78,5,9,0,0,78,79,5,4,
-        0,0,79,80,5,10,0,0,80,81,5,3,0,0,81,88,5,11,0,0,82,83,5,7,0,0,83,
-        84,5,10,0,0,84,85,5,3,0,0,85,87,5,11,0,0,86,82,1,0,0,0,87,90,1,0,
-        0,0,88,86,1,0,0,0,88,89,1,0,0,0,89,91,1,0,0,0,90,88,1,0,0,0,91,92,
-        5,5,0,0,92,17,1,0,0,0,93,94,5,11,0,0,94,95,5,4,0,0,95,96,5,10,0,
-        0,96,97,5,3,0,0,97,104,5,11,0,0,98,99,5,7,0,0,99,100,5,10,0,0,100,
-        101,5,3,0,0,101,103,5,11,0,0,102,98,1,0,0,0,103,106,1,0,0,0,104,
-        102,1,0,0,0,104,105,1,0,0,0,105,107,1,0,0,0,106,104,1,0,0,0,107,
-        108,5,5,0,0,108,19,1,0,0,0,9,22,30,39,51,60,68,72,88,104
+        4,1,15,184,2,0,7,0,2,1,7,1,2,2,7,2,2,3,7,3,2,4,7,4,2,5,7,5,2,6,7,
+        6,2,7,7,7,2,8,7,8,2,9,7,9,2,10,7,10,2,11,7,11,2,12,7,12,2,13,7,13,
+        1,0,1,0,4,0,31,8,0,11,0,12,0,32,1,0,3,0,36,8,0,1,0,1,0,1,0,1,1,1,
+        1,1,1,3,1,44,8,1,1,1,1,1,1,2,1,2,1,2,5,2,51,8,2,10,2,12,2,54,9,2,
+        1,3,1,3,1,3,1,3,1,4,1,4,1,4,5,4,63,8,4,10,4,12,4,66,9,4,1,5,1,5,
+        1,5,1,5,5,5,72,8,5,10,5,12,5,75,9,5,1,5,1,5,1,6,1,6,1,6,1,6,1,6,
+        1,6,1,6,1,6,3,6,87,8,6,1,7,1,7,1,7,1,7,5,7,93,8,7,10,7,12,7,96,9,
+        7,1,7,1,7,1,8,4,8,101,8,8,11,8,12,8,102,1,9,1,9,1,9,3,9,108,8,9,
+        1,10,1,10,1,10,1,10,1,10,1,10,1,10,1,10,1,10,1,10,1,10,1,10,5,10,
+        122,8,10,10,10,12,10,125,9,10,1,10,1,10,1,11,1,11,1,11,1,11,1,11,
+        1,11,1,11,1,11,1,11,5,11,138,8,11,10,11,12,11,141,9,11,1,11,1,11,
+        1,12,1,12,1,12,1,12,1,12,1,12,1,12,1,12,1,12,1,12,1,12,3,12,156,
+        8,12,1,12,1,12,1,12,1,12,1,12,1,12,1,12,1,12,5,12,166,8,12,10,12,
+        12,12,169,9,12,1,12,1,12,1,13,1,13,1,13,1,13,1,13,1,13,3,13,179,
+        8,13,1,13,3,13,182,8,13,1,13,0,0,14,0,2,4,6,8,10,12,14,16,18,20,
+        22,24,26,0,1,2,0,7,7,12,12,187,0,30,1,0,0,0,2,40,1,0,0,0,4,47,1,
+        0,0,0,6,55,1,0,0,0,8,59,1,0,0,0,10,67,1,0,0,0,12,78,1,0,0,0,14,88,
+        1,0,0,0,16,100,1,0,0,0,18,107,1,0,0,0,20,109,1,0,0,0,22,128,1,0,
+        0,0,24,144,1,0,0,0,26,181,1,0,0,0,28,31,3,2,1,0,29,31,3,10,5,0,30,
+        28,1,0,0,0,30,29,1,0,0,0,31,32,1,0,0,0,32,30,1,0,0,0,32,33,1,0,0,
+        0,33,35,1,0,0,0,34,36,3,14,7,0,35,34,1,0,0,0,35,36,1,0,0,0,36,37,
+        1,0,0,0,37,38,3,16,8,0,38,39,5,0,0,1,39,1,1,0,0,0,40,43,5,1,0,0,
+        41,44,3,4,2,0,42,44,3,8,4,0,43,41,1,0,0,0,43,42,1,0,0,0,44,45,1,
+        0,0,0,45,46,5,5,0,0,46,3,1,0,0,0,47,52,3,6,3,0,48,49,5,6,0,0,49,
+        51,3,6,3,0,50,48,1,0,0,0,51,54,1,0,0,0,52,50,1,0,0,0,52,53,1,0,0,
+        0,53,5,1,0,0,0,54,52,1,0,0,0,55,56,5,14,0,0,56,57,5,3,0,0,57,58,
+        5,13,0,0,58,7,1,0,0,0,59,64,5,14,0,0,60,61,5,6,0,0,61,63,5,14,0,
+        0,62,60,1,0,0,0,63,66,1,0,0,0,64,62,1,0,0,0,64,65,1,0,0,0,65,9,1,
+        0,0,0,66,64,1,0,0,0,67,68,5,1,0,0,68,73,3,12,6,0,69,70,5,6,0,0,70,
+        72,3,12,6,0,71,69,1,0,0,0,72,75,1,0,0,0,73,71,1,0,0,0,73,74,1,0,
+        0,0,74,76,1,0,0,0,75,73,1,0,0,0,76,77,5,5,0,0,77,11,1,0,0,0,78,79,
+        5,14,0,0,79,80,5,8,0,0,80,81,5,13,0,0,81,82,5,10,0,0,82,83,5,13,
+        0,0,83,86,5,9,0,0,84,85,5,3,0,0,85,87,5,13,0,0,86,84,1,0,0,0,86,
+        87,1,0,0,0,87,13,1,0,0,0,88,89,5,2,0,0,89,94,5,14,0,0,90,91,5,6,
+        0,0,91,93,5,14,0,0,92,90,1,0,0,0,93,96,1,0,0,0,94,92,1,0,0,0,94,
+        95,1,0,0,0,95,97,1,0,0,0,96,94,1,0,0,0,97,98,5,5,0,0,98,15,1,0,0,
+        0,99,101,3,18,9,0,100,99,1,0,0,0,101,102,1,0,0,0,102,100,1,0,0,0,
+        102,103,1,0,0,0,103,17,1,0,0,0,104,108,3,20,10,0,105,108,3,22,11,
+        0,106,108,3,24,12,0,107,104,1,0,0,0,107,105,1,0,0,0,107,106,1,0,
+        0,0,108,19,1,0,0,0,109,110,5,14,0,0,110,111,5,8,0,0,111,112,5,14,
+        0,0,112,113,5,9,0,0,113,114,5,4,0,0,114,115,5,13,0,0,115,116,5,3,
+        0,0,116,123,5,14,0,0,117,118,5,7,0,0,118,119,5,13,0,0,119,120,5,
+        3,0,0,120,122,5,14,0,0,121,117,1,0,0,0,122,125,1,0,0,0,123,121,1,
+        0,0,0,123,124,1,0,0,0,124,126,1,0,0,0,125,123,1,0,0,0,126,127,5,
+        5,0,0,127,21,1,0,0,0,128,129,5,14,0,0,129,130,5,4,0,0,130,131,5,
+        13,0,0,131,132,5,3,0,0,132,139,5,14,0,0,133,134,5,7,0,0,134,135,
+        5,13,0,0,135,136,5,3,0,0,136,138,5,14,0,0,137,133,1,0,0,0,138,141,
+        1,0,0,0,139,137,1,0,0,0,139,140,1,0,0,0,140,142,1,0,0,0,141,139,
+        1,0,0,0,142,143,5,5,0,0,143,23,1,0,0,0,144,145,5,14,0,0,145,146,
+        5,8,0,0,146,147,5,14,0,0,147,148,5,11,0,0,148,149,5,13,0,0,149,150,
+        5,10,0,0,150,151,5,13,0,0,151,155,5,9,0,0,152,153,5,8,0,0,153,154,
+        5,14,0,0,154,156,5,9,0,0,155,152,1,0,0,0,155,156,1,0,0,0,156,157,
+        1,0,0,0,157,158,5,4,0,0,158,159,5,13,0,0,159,160,5,3,0,0,160,167,
+        3,26,13,0,161,162,5,7,0,0,162,163,5,13,0,0,163,164,5,3,0,0,164,166,
+        3,26,13,0,165,161,1,0,0,0,166,169,1,0,0,0,167,165,1,0,0,0,167,168,
+        1,0,0,0,168,170,1,0,0,0,169,167,1,0,0,0,170,171,5,5,0,0,171,25,1,
+        0,0,0,172,182,5,14,0,0,173,174,5,14,0,0,174,175,5,8,0,0,175,178,
+        5,14,0,0,176,177,7,0,0,0,177,179,5,13,0,0,178,176,1,0,0,0,178,179,
+        1,0,0,0,179,180,1,0,0,0,180,182,5,9,0,0,181,172,1,0,0,0,181,173,
+        1,0,0,0,182,27,1,0,0,0,17,30,32,35,43,52,64,73,86,94,102,107,123,
+        139,155,167,178,181
     ]
 
 class gramParser ( Parser ):
@@ -56,26 +84,30 @@ class gramParser ( Parser ):
     sharedContextCache = PredictionContextCache()
 
     literalNames = [ "<INVALID>", "'States'", "'Actions'", "':'", "'->'", 
-                     "';'", "','", "'+'", "'['", "']'" ]
+                     "';'", "','", "'+'", "'['", "']'", "'..'", "'='", "'-'" ]
 
     symbolicNames = [ "<INVALID>", "STATES", "ACTIONS", "DPOINT", "FLECHE", 
-                      "SEMI", "VIRG", "PLUS", "LCROCH", "RCROCH", "INT", 
-                      "ID", "WS" ]
+                      "SEMI", "VIRG", "PLUS", "LCROCH", "RCROCH", "RANGE", 
+                      "EQ", "MINUS", "INT", "ID", "WS" ]
 
     RULE_program = 0
     RULE_defstates = 1
     RULE_state_reward_list = 2
     RULE_state_reward = 3
     RULE_state_list = 4
-    RULE_defactions = 5
-    RULE_transitions = 6
-    RULE_trans = 7
-    RULE_transact = 8
-    RULE_transnoact = 9
+    RULE_deffamily = 5
+    RULE_family = 6
+    RULE_defactions = 7
+    RULE_transitions = 8
+    RULE_trans = 9
+    RULE_transact = 10
+    RULE_transnoact = 11
+    RULE_transtemplate = 12
+    RULE_target = 13
 
     ruleNames =  [ "program", "defstates", "state_reward_list", "state_reward", 
-                   "state_list", "defactions", "transitions", "trans", "transact", 
-                   "transnoact" ]
+                   "state_list", "deffamily", "family", "defactions", "transitions", 
+                   "trans", "transact", "transnoact", "transtemplate", "target" ]
 
     EOF = Token.EOF
     STATES=1
@@ -87,9 +119,12 @@ class gramParser ( Parser ):
     PLUS=7
     LCROCH=8
     RCROCH=9
-    INT=10
-    ID=11
-    WS=12
+    RANGE=10
+    EQ=11
+    MINUS=12
+    INT=13
+    ID=14
+    WS=15
 
     def __init__(self, input:TokenStream, output:TextIO = sys.stdout):
         super().__init__(input, output)
@@ -107,10 +142,6 @@ class gramParser ( Parser ):
             super().__init__(parent, invokingState)
             self.parser = parser
 
-        def defstates(self):
-            return self.getTypedRuleContext(gramParser.DefstatesContext,0)
-
-
         def transitions(self):
             return self.getTypedRuleContext(gramParser.TransitionsContext,0)
 
@@ -118,6 +149,20 @@ class gramParser ( Parser ):
         def EOF(self):
             return self.getToken(gramParser.EOF, 0)
 
+        def defstates(self, i:int=None):
+            if i is None:
+                return self.getTypedRuleContexts(gramParser.DefstatesContext)
+            else:
+                return self.getTypedRuleContext(gramParser.DefstatesContext,i)
+
+
+        def deffamily(self, i:int=None):
+            if i is None:
+                return self.getTypedRuleContexts(gramParser.DeffamilyContext)
+            else:
+                return self.getTypedRuleContext(gramParser.DeffamilyContext,i)
+
+
         def defactions(self):
             return self.getTypedRuleContext(gramParser.DefactionsContext,0)
 
@@ -143,19 +188,41 @@ class gramParser ( Parser ):
         self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 20
-            self.defstates()
-            self.state = 22
+            self.state = 30 
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            while True:
+                self.state = 30
+                self._errHandler.sync(self)
+                la_ = self._interp.adaptivePredict(self._input,0,self._ctx)
+                if la_ == 1:
+                    self.state = 28
+                    self.defstates()
+                    pass
+
+                elif la_ == 2:
+                    self.state = 29
+                    self.deffamily()
+                    pass
+
+
+                self.state = 32 
+                self._errHandler.sync(self)
+                _la = self._input.LA(1)
+                if not (_la==1):
+                    break
+
+            self.state = 35
             self._errHandler.sync(self)
             _la = self._input.LA(1)
             if _la==2:
-                self.state = 21
+                self.state = 34
                 self.defactions()
 
 
-            self.state = 24
+            self.state = 37
             self.transitions()
-            self.state = 25
+            self.state = 38
             self.match(gramParser.EOF)
         except RecognitionException as re:
             localctx.exception = re
@@ -207,23 +274,23 @@ class gramParser ( Parser ):
         self.enterRule(localctx, 2, self.RULE_defstates)
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 27
+            self.state = 40
             self.match(gramParser.STATES)
-            self.state = 30
+            self.state = 43
             self._errHandler.sync(self)
-            la_ = self._interp.adaptivePredict(self._input,1,self._ctx)
+            la_ = self._interp.adaptivePredict(self._input,3,self._ctx)
             if la_ == 1:
-                self.state = 28
+                self.state = 41
                 self.state_reward_list()
                 pass
 
             elif la_ == 2:
-                self.state = 29
+                self.state = 42
                 self.state_list()
                 pass
 
 
-            self.state = 32
+            self.state = 45
             self.match(gramParser.SEMI)
         except RecognitionException as re:
             localctx.exception = re
@@ -275,17 +342,17 @@ class gramParser ( Parser ):
         self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 34
+            self.state = 47
             self.state_reward()
-            self.state = 39
+            self.state = 52
             self._errHandler.sync(self)
             _la = self._input.LA(1)
             while _la==6:
-                self.state = 35
+                self.state = 48
                 self.match(gramParser.VIRG)
-                self.state = 36
+                self.state = 49
                 self.state_reward()
-                self.state = 41
+                self.state = 54
                 self._errHandler.sync(self)
                 _la = self._input.LA(1)
 
@@ -334,11 +401,11 @@ class gramParser ( Parser ):
         self.enterRule(localctx, 6, self.RULE_state_reward)
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 42
+            self.state = 55
             self.match(gramParser.ID)
-            self.state = 43
+            self.state = 56
             self.match(gramParser.DPOINT)
-            self.state = 44
+            self.state = 57
             self.match(gramParser.INT)
         except RecognitionException as re:
             localctx.exception = re
@@ -389,20 +456,174 @@ class gramParser ( Parser ):
         self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 46
+            self.state = 59
             self.match(gramParser.ID)
-            self.state = 51
+            self.state = 64
             self._errHandler.sync(self)
             _la = self._input.LA(1)
             while _la==6:
-                self.state = 47
+                self.state = 60
                 self.match(gramParser.VIRG)
-                self.state = 48
+                self.state = 61
                 self.match(gramParser.ID)
-                self.state = 53
+                self.state = 66
+                self._errHandler.sync(self)
+                _la = self._input.LA(1)
+
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
+    class DeffamilyContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def STATES(self):
+            return self.getToken(gramParser.STATES, 0)
+
+        def family(self, i:int=None):
+            if i is None:
+                return self.getTypedRuleContexts(gramParser.FamilyContext)
+            else:
+                return self.getTypedRuleContext(gramParser.FamilyContext,i)
+
+
+        def SEMI(self):
+            return self.getToken(gramParser.SEMI, 0)
+
+        def VIRG(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.VIRG)
+            else:
+                return self.getToken(gramParser.VIRG, i)
+
+        def getRuleIndex(self):
+            return gramParser.RULE_deffamily
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterDeffamily" ):
+                listener.enterDeffamily(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitDeffamily" ):
+                listener.exitDeffamily(self)
+
+
+
+
+    def deffamily(self):
+
+        localctx = gramParser.DeffamilyContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 10, self.RULE_deffamily)
+        self._la = 0 # Token type
+        try:
+            self.enterOuterAlt(localctx, 1)
+            self.state = 67
+            self.match(gramParser.STATES)
+            self.state = 68
+            self.family()
+            self.state = 73
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            while _la==6:
+                self.state = 69
+                self.match(gramParser.VIRG)
+                self.state = 70
+                self.family()
+                self.state = 75
                 self._errHandler.sync(self)
                 _la = self._input.LA(1)
 
+            self.state = 76
+            self.match(gramParser.SEMI)
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
+    class FamilyContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def ID(self):
+            return self.getToken(gramParser.ID, 0)
+
+        def LCROCH(self):
+            return self.getToken(gramParser.LCROCH, 0)
+
+        def INT(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.INT)
+            else:
+                return self.getToken(gramParser.INT, i)
+
+        def RANGE(self):
+            return self.getToken(gramParser.RANGE, 0)
+
+        def RCROCH(self):
+            return self.getToken(gramParser.RCROCH, 0)
+
+        def DPOINT(self):
+            return self.getToken(gramParser.DPOINT, 0)
+
+        def getRuleIndex(self):
+            return gramParser.RULE_family
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterFamily" ):
+                listener.enterFamily(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitFamily" ):
+                listener.exitFamily(self)
+
+
+
+
+    def family(self):
+
+        localctx = gramParser.FamilyContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 12, self.RULE_family)
+        self._la = 0 # Token type
+        try:
+            self.enterOuterAlt(localctx, 1)
+            self.state = 78
+            self.match(gramParser.ID)
+            self.state = 79
+            self.match(gramParser.LCROCH)
+            self.state = 80
+            self.match(gramParser.INT)
+            self.state = 81
+            self.match(gramParser.RANGE)
+            self.state = 82
+            self.match(gramParser.INT)
+            self.state = 83
+            self.match(gramParser.RCROCH)
+            self.state = 86
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            if _la==3:
+                self.state = 84
+                self.match(gramParser.DPOINT)
+                self.state = 85
+                self.match(gramParser.INT)
+
+
         except RecognitionException as re:
             localctx.exception = re
             self._errHandler.reportError(self, re)
@@ -454,27 +675,27 @@ class gramParser ( Parser ):
     def defactions(self):
 
         localctx = gramParser.DefactionsContext(self, self._ctx, self.state)
-        self.enterRule(localctx, 10, self.RULE_defactions)
+        self.enterRule(localctx, 14, self.RULE_defactions)
         self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 54
+            self.state = 88
             self.match(gramParser.ACTIONS)
-            self.state = 55
+            self.state = 89
             self.match(gramParser.ID)
-            self.state = 60
+            self.state = 94
             self._errHandler.sync(self)
             _la = self._input.LA(1)
             while _la==6:
-                self.state = 56
+                self.state = 90
                 self.match(gramParser.VIRG)
-                self.state = 57
+                self.state = 91
                 self.match(gramParser.ID)
-                self.state = 62
+                self.state = 96
                 self._errHandler.sync(self)
                 _la = self._input.LA(1)
 
-            self.state = 63
+            self.state = 97
             self.match(gramParser.SEMI)
         except RecognitionException as re:
             localctx.exception = re
@@ -516,20 +737,20 @@ class gramParser ( Parser ):
     def transitions(self):
 
         localctx = gramParser.TransitionsContext(self, self._ctx, self.state)
-        self.enterRule(localctx, 12, self.RULE_transitions)
+        self.enterRule(localctx, 16, self.RULE_transitions)
         self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 66 
+            self.state = 100 
             self._errHandler.sync(self)
             _la = self._input.LA(1)
             while True:
-                self.state = 65
+                self.state = 99
                 self.trans()
-                self.state = 68 
+                self.state = 102 
                 self._errHandler.sync(self)
                 _la = self._input.LA(1)
-                if not (_la==11):
+                if not (_la==14):
                     break
 
         except RecognitionException as re:
@@ -556,6 +777,10 @@ class gramParser ( Parser ):
             return self.getTypedRuleContext(gramParser.TransnoactContext,0)
 
 
+        def transtemplate(self):
+            return self.getTypedRuleContext(gramParser.TranstemplateContext,0)
+
+
         def getRuleIndex(self):
             return gramParser.RULE_trans
 
@@ -573,23 +798,29 @@ class gramParser ( Parser ):
     def trans(self):
 
         localctx = gramParser.TransContext(self, self._ctx, self.state)
-        self.enterRule(localctx, 14, self.RULE_trans)
+        self.enterRule(localctx, 18, self.RULE_trans)
         try:
-            self.state = 72
+            self.state = 107
             self._errHandler.sync(self)
-            la_ = self._interp.adaptivePredict(self._input,6,self._ctx)
+            la_ = self._interp.adaptivePredict(self._input,10,self._ctx)
             if la_ == 1:
                 self.enterOuterAlt(localctx, 1)
-                self.state = 70
+                self.state = 104
                 self.transact()
                 pass
 
             elif la_ == 2:
                 self.enterOuterAlt(localctx, 2)
-                self.state = 71
+                self.state = 105
                 self.transnoact()
                 pass
 
+            elif la_ == 3:
+                self.enterOuterAlt(localctx, 3)
+                self.state = 106
+                self.transtemplate()
+                pass
+
 
         except RecognitionException as re:
             localctx.exception = re
@@ -660,43 +891,43 @@ class gramParser ( Parser ):
     def transact(self):
 
         localctx = gramParser.TransactContext(self, self._ctx, self.state)
-        self.enterRule(localctx, 16, self.RULE_transact)
+        self.enterRule(localctx, 20, self.RULE_transact)
         self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 74
+            self.state = 109
             self.match(gramParser.ID)
-            self.state = 75
+            self.state = 110
             self.match(gramParser.LCROCH)
-            self.state = 76
+            self.state = 111
             self.match(gramParser.ID)
-            self.state = 77
+            self.state = 112
             self.match(gramParser.RCROCH)
-            self.state = 78
+            self.state = 113
             self.match(gramParser.FLECHE)
-            self.state = 79
+            self.state = 114
             self.match(gramParser.INT)
-            self.state = 80
+            self.state = 115
             self.match(gramParser.DPOINT)
-            self.state = 81
+            self.state = 116
             self.match(gramParser.ID)
-            self.state = 88
+            self.state = 123
             self._errHandler.sync(self)
             _la = self._input.LA(1)
             while _la==7:
-                self.state = 82
+                self.state = 117
                 self.match(gramParser.PLUS)
-                self.state = 83
+                self.state = 118
                 self.match(gramParser.INT)
-                self.state = 84
+                self.state = 119
                 self.match(gramParser.DPOINT)
-                self.state = 85
+                self.state = 120
                 self.match(gramParser.ID)
-                self.state = 90
+                self.state = 125
                 self._errHandler.sync(self)
                 _la = self._input.LA(1)
 
-            self.state = 91
+            self.state = 126
             self.match(gramParser.SEMI)
         except RecognitionException as re:
             localctx.exception = re
@@ -761,37 +992,37 @@ class gramParser ( Parser ):
     def transnoact(self):
 
         localctx = gramParser.TransnoactContext(self, self._ctx, self.state)
-        self.enterRule(localctx, 18, self.RULE_transnoact)
+        self.enterRule(localctx, 22, self.RULE_transnoact)
         self._la = 0 # Token type
         try:
             self.enterOuterAlt(localctx, 1)
-            self.state = 93
+            self.state = 128
             self.match(gramParser.ID)
-            self.state = 94
+            self.state = 129
             self.match(gramParser.FLECHE)
-            self.state = 95
+            self.state = 130
             self.match(gramParser.INT)
-            self.state = 96
+            self.state = 131
             self.match(gramParser.DPOINT)
-            self.state = 97
+            self.state = 132
             self.match(gramParser.ID)
-            self.state = 104
+            self.state = 139
             self._errHandler.sync(self)
             _la = self._input.LA(1)
             while _la==7:
-                self.state = 98
+                self.state = 133
                 self.match(gramParser.PLUS)
-                self.state = 99
+                self.state = 134
                 self.match(gramParser.INT)
-                self.state = 100
+                self.state = 135
                 self.match(gramParser.DPOINT)
-                self.state = 101
+                self.state = 136
                 self.match(gramParser.ID)
-                self.state = 106
+                self.state = 141
                 self._errHandler.sync(self)
                 _la = self._input.LA(1)
 
-            self.state = 107
+            self.state = 142
             self.match(gramParser.SEMI)
         except RecognitionException as re:
             localctx.exception = re
@@ -802,6 +1033,246 @@ class gramParser ( Parser ):
         return localctx
 
 
+    class TranstemplateContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def ID(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.ID)
+            else:
+                return self.getToken(gramParser.ID, i)
+
+        def LCROCH(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.LCROCH)
+            else:
+                return self.getToken(gramParser.LCROCH, i)
+
+        def EQ(self):
+            return self.getToken(gramParser.EQ, 0)
+
+        def INT(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.INT)
+            else:
+                return self.getToken(gramParser.INT, i)
+
+        def RANGE(self):
+            return self.getToken(gramParser.RANGE, 0)
+
+        def RCROCH(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.RCROCH)
+            else:
+                return self.getToken(gramParser.RCROCH, i)
+
+        def FLECHE(self):
+            return self.getToken(gramParser.FLECHE, 0)
+
+        def DPOINT(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.DPOINT)
+            else:
+                return self.getToken(gramParser.DPOINT, i)
+
+        def target(self, i:int=None):
+            if i is None:
+                return self.getTypedRuleContexts(gramParser.TargetContext)
+            else:
+                return self.getTypedRuleContext(gramParser.TargetContext,i)
+
+
+        def SEMI(self):
+            return self.getToken(gramParser.SEMI, 0)
+
+        def PLUS(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.PLUS)
+            else:
+                return self.getToken(gramParser.PLUS, i)
+
+        def getRuleIndex(self):
+            return gramParser.RULE_transtemplate
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterTranstemplate" ):
+                listener.enterTranstemplate(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitTranstemplate" ):
+                listener.exitTranstemplate(self)
+
+
+
+
+    def transtemplate(self):
+
+        localctx = gramParser.TranstemplateContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 24, self.RULE_transtemplate)
+        self._la = 0 # Token type
+        try:
+            self.enterOuterAlt(localctx, 1)
+            self.state = 144
+            self.match(gramParser.ID)
+            self.state = 145
+            self.match(gramParser.LCROCH)
+            self.state = 146
+            self.match(gramParser.ID)
+            self.state = 147
+            self.match(gramParser.EQ)
+            self.state = 148
+            self.match(gramParser.INT)
+            self.state = 149
+            self.match(gramParser.RANGE)
+            self.state = 150
+            self.match(gramParser.INT)
+            self.state = 151
+            self.match(gramParser.RCROCH)
+            self.state = 155
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            if _la==8:
+                self.state = 152
+                self.match(gramParser.LCROCH)
+                self.state = 153
+                self.match(gramParser.ID)
+                self.state = 154
+                self.match(gramParser.RCROCH)
+
+
+            self.state = 157
+            self.match(gramParser.FLECHE)
+            self.state = 158
+            self.match(gramParser.INT)
+            self.state = 159
+            self.match(gramParser.DPOINT)
+            self.state = 160
+            self.target()
+            self.state = 167
+            self._errHandler.sync(self)
+            _la = self._input.LA(1)
+            while _la==7:
+                self.state = 161
+                self.match(gramParser.PLUS)
+                self.state = 162
+                self.match(gramParser.INT)
+                self.state = 163
+                self.match(gramParser.DPOINT)
+                self.state = 164
+                self.target()
+                self.state = 169
+                self._errHandler.sync(self)
+                _la = self._input.LA(1)
+
+            self.state = 170
+            self.match(gramParser.SEMI)
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
+    class TargetContext(ParserRuleContext):
+        __slots__ = 'parser'
+
+        def __init__(self, parser, parent:ParserRuleContext=None, invokingState:int=-1):
+            super().__init__(parent, invokingState)
+            self.parser = parser
+
+        def ID(self, i:int=None):
+            if i is None:
+                return self.getTokens(gramParser.ID)
+            else:
+                return self.getToken(gramParser.ID, i)
+
+        def LCROCH(self):
+            return self.getToken(gramParser.LCROCH, 0)
+
+        def RCROCH(self):
+            return self.getToken(gramParser.RCROCH, 0)
+
+        def INT(self):
+            return self.getToken(gramParser.INT, 0)
+
+        def PLUS(self):
+            return self.getToken(gramParser.PLUS, 0)
+
+        def MINUS(self):
+            return self.getToken(gramParser.MINUS, 0)
+
+        def getRuleIndex(self):
+            return gramParser.RULE_target
+
+        def enterRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "enterTarget" ):
+                listener.enterTarget(self)
+
+        def exitRule(self, listener:ParseTreeListener):
+            if hasattr( listener, "exitTarget" ):
+                listener.exitTarget(self)
+
+
+
+
+    def target(self):
+
+        localctx = gramParser.TargetContext(self, self._ctx, self.state)
+        self.enterRule(localctx, 26, self.RULE_target)
+        self._la = 0 # Token type
+        try:
+            self.state = 181
+            self._errHandler.sync(self)
+            la_ = self._interp.adaptivePredict(self._input,16,self._ctx)
+            if la_ == 1:
+                self.enterOuterAlt(localctx, 1)
+                self.state = 172
+                self.match(gramParser.ID)
+                pass
+
+            elif la_ == 2:
+                self.enterOuterAlt(localctx, 2)
+                self.state = 173
+                self.match(gramParser.ID)
+                self.state = 174
+                self.match(gramParser.LCROCH)
+                self.state = 175
+                self.match(gramParser.ID)
+                self.state = 178
+                self._errHandler.sync(self)
+                _la = self._input.LA(1)
+                if _la==7 or _la==12:
+                    self.state = 176
+                    _la = self._input.LA(1)
+                    if not(_la==7 or _la==12):
+                        self._errHandler.recoverInline(self)
+                    else:
+                        self._errHandler.reportMatch(self)
+                        self.consume()
+                    self.state = 177
+                    self.match(gramParser.INT)
+
+
+                self.state = 180
+                self.match(gramParser.RCROCH)
+                pass
+
+
+        except RecognitionException as re:
+            localctx.exception = re
+            self._errHandler.reportError(self, re)
+            self._errHandler.recover(self, re)
+        finally:
+            self.exitRule()
+        return localctx
+
+
 
 
 
@@ -0,0 +1,327 @@
+import os
+import re
+import numpy as np
+from models import TemporaryModel, TransitionStore
+from pools import process_pool
+
+# same tokens as the lexer rules of gram.g4
+TOKEN = re.compile(r'\s*(?:(->|\.\.)|([:;,+\[\]=-])|([0-9]+)|([a-zA-Z_][a-zA-Z_0-9]*)|(\S))')
+KEYWORDS = {'States': 'STATES', 'Actions': 'ACTIONS'}
+SYMBOLS = {':': 'DPOINT', ';': 'SEMI', ',': 'VIRG', '+': 'PLUS', '[': 'LCROCH', ']': 'RCROCH', '=': 'EQ', '-': 'MINUS',
+           '->': 'FLECHE', '..': 'RANGE'}
+
+
+def tokenize(lines):
+    for line_number, line in enumerate(lines, 1):
+        for match in TOKEN.finditer(line):
+            operator, symbol, integer, identifier, other = match.groups()
+            if operator:
+                yield SYMBOLS[operator], operator, line_number
+            elif symbol:
+                yield SYMBOLS[symbol], symbol, line_number
+            elif integer:
+                yield 'INT', integer, line_number
+            elif identifier:
+                yield KEYWORDS.get(identifier, 'ID'), identifier, line_number
+            elif other:
+                raise Exception(f"Error: line {line_number}: token recognition error at: '{other}'")
+
+
+class StatementParser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self, ahead=0):
+        position = self.position + ahead
+        return self.tokens[position][0] if position < len(self.tokens) else 'SEMI'
+
+    def expect(self, kind):
+        if self.peek() != kind:
+            token = self.tokens[min(self.position, len(self.tokens) - 1)]
+            raise Exception(f"Error: line {token[2]}: expected {kind} at '{token[1]}'")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token[1]
+
+    def end(self):
+        self.expect('SEMI')
+
+
+def parse_states(statement, model):
+    statement.expect('STATES')
+    states = []
+    rewards = {}
+    while True:
+        state = statement.expect('ID')
+        if statement.peek() == 'DPOINT':
+            statement.expect('DPOINT')
+            rewards[state] = int(statement.expect('INT'))
+        states.append(state)
+        if statement.peek() != 'VIRG':
+            break
+        statement.expect('VIRG')
+    statement.end()
+    if rewards and len(rewards) != len(set(states)):
+        raise Exception(f'Error: line {statement.tokens[0][2]}: either every state or no state has a reward')
+    model.add_states(states, rewards if rewards else None)
+
+
+def parse_families(statement, model):
+    line = statement.tokens[0][2]
+    statement.expect('STATES')
+    while True:
+        name = statement.expect('ID')
+        statement.expect('LCROCH')
+        first = int(statement.expect('INT'))
+        statement.expect('RANGE')
+        last = int(statement.expect('INT'))
+        statement.expect('RCROCH')
+        reward = None
+        if statement.peek() == 'DPOINT':
+            statement.expect('DPOINT')
+            reward = int(statement.expect('INT'))
+        model.add_family(name, first, last, reward, line)
+        if statement.peek() != 'VIRG':
+            break
+        statement.expect('VIRG')
+    statement.end()
+
+
+def parse_actions(statement, model):
+    statement.expect('ACTIONS')
+    actions = [statement.expect('ID')]
+    while statement.peek() == 'VIRG':
+        statement.expect('VIRG')
+        actions.append(statement.expect('ID'))
+    statement.end()
+    model.add_actions(actions)
+
+
+def parse_transition(statement, model):
+    dep = statement.expect('ID')
+    act = None
+    if statement.peek() == 'LCROCH':
+        statement.expect('LCROCH')
+        act = statement.expect('ID')
+        statement.expect('RCROCH')
+    statement.expect('FLECHE')
+    targets = []
+    weights = []
+    while True:
+        weights.append(int(statement.expect('INT')))
+        statement.expect('DPOINT')
+        targets.append(statement.expect('ID'))
+        if statement.peek() != 'PLUS':
+            break
+        statement.expect('PLUS')
+    statement.end()
+    model.add_transitions(dep, act, targets, weights, statement.tokens[0][2])
+
+
+def parse_template(statement, model):
+    line = statement.tokens[0][2]
+    family = statement.expect('ID')
+    statement.expect('LCROCH')
+    variable = statement.expect('ID')
+    statement.expect('EQ')
+    first = int(statement.expect('INT'))
+    statement.expect('RANGE')
+    last = int(statement.expect('INT'))
+    statement.expect('RCROCH')
+    act = None
+    if statement.peek() == 'LCROCH':
+        statement.expect('LCROCH')
+        act = statement.expect('ID')
+        statement.expect('RCROCH')
+    statement.expect('FLECHE')
+    targets = []
+    weights = []
+    while True:
+        weights.append(int(statement.expect('INT')))
+        statement.expect('DPOINT')
+        name = statement.expect('ID')
+        offset = None
+        if statement.peek() == 'LCROCH':
+            statement.expect('LCROCH')
+            if statement.expect('ID') != variable:
+                raise Exception(f"Error: line {line}: unknown index variable, expected '{variable}'")
+            offset = 0
+            if statement.peek() in ('PLUS', 'MINUS'):
+                sign = -1 if statement.expect(statement.peek()) == '-' else 1
+                offset = sign * int(statement.expect('INT'))
+            statement.expect('RCROCH')
+        targets.append((name, offset))
+        if statement.peek() != 'PLUS':
+            break
+        statement.expect('PLUS')
+    statement.end()
+    model.add_template(family, first, last, act, targets, weights, line)
+
+
+def read_model(lines, model=None, shard=False):
+    # one statement at a time: tokens are buffered only up to the next ';'
+    # a shard holds either the declarations or transitions only
+    model = model if model is not None else TemporaryModel()
+    section = 'STATES'
+    statement = []
+    line_number = 0
+    for token in tokenize(lines):
+        statement.append(token)
+        line_number = token[2]
+        if token[0] != 'SEMI':
+            continue
+        parser = StatementParser(statement)
+        kind = statement[0][0]
+        if shard and section == 'STATES' and kind != 'STATES':
+            section = 'TRANSITIONS'
+        if kind == 'STATES' and section in ('STATES', 'ACTIONS'):
+            if parser.peek(2) == 'LCROCH':
+                parse_families(parser, model)
+            else:
+                parse_states(parser, model)
+            section = 'ACTIONS'
+        elif section == 'STATES':
+            parse_states(parser, model)
+        elif kind == 'ACTIONS' and section == 'ACTIONS':
+            parse_actions(parser, model)
+            section = 'TRANSITIONS'
+        elif kind == 'ID' and section != 'STATES':
+            if parser.peek(3) == 'EQ':
+                parse_template(parser, model)
+            else:
+                parse_transition(parser, model)
+            section = 'MORE_TRANSITIONS'
+        else:
+            raise Exception(f"Error: line {statement[0][2]}: unexpected '{statement[0][1]}'")
+        statement = []
+    if statement:
+        raise Exception(f"Error: line {line_number}: missing ';'")
+    if section != 'MORE_TRANSITIONS' and not shard:
+        raise Exception('Error: the model has no transition')
+    return model
+
+
+def load_temporary_model(filename):
+    with open(filename) as f:
+        return read_model(f)
+
+
+def load_model(filename):
+    return load_temporary_model(filename).generate_model()
+
+
+def shard_files(paths):
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            filenames.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.mdp')))
+        else:
+            filenames.append(path)
+    if not filenames:
+        raise Exception('Error: no .mdp file to load')
+    return filenames
+
+
+def is_header(filename):
+    with open(filename) as f:
+        return next(tokenize(f), ('SEMI',))[0] == 'STATES'
+
+
+# declarations of the worker processes, set once per worker by process_pool;
+# the name tables grow with the undeclared names met by the worker
+_shard_header = None
+
+
+def _init_shard_worker(header):
+    global _shard_header
+    _shard_header = header
+
+
+def shard_arrays(filename, model):
+    source, target, action, weight = model.store.columns()
+    # ids past the declarations are local to the process, so their names travel with the arrays
+    names, action_names = model.store.state_names, model.store.action_names
+    extra_states = {i: names[i] for i in np.unique(np.concatenate((source, target))).tolist() if i >= len(model.states)}
+    extra_actions = {i: action_names[i] for i in np.unique(action).tolist() if i >= len(model.actions)}
+    return filename, source, target, action, weight, model.store.line[:len(model.store)], extra_states, extra_actions
+
+
+def read_shard(header, filename):
+    model = TemporaryModel(TransitionStore())
+    model.states, model.actions, model.families = header.states, header.actions, header.families
+    store = model.store
+    store.state_names, store.state_ids = header.store.state_names, header.store.state_ids
+    store.action_names, store.action_ids = header.store.action_names, header.store.action_ids
+    try:
+        with open(filename) as f:
+            read_model(f, model, shard=True)
+    except Exception as e:
+        raise Exception(f'Error: {filename}: {str(e).removeprefix("Error: ")}') from None
+    return shard_arrays(filename, model)
+
+
+def _read_shard(filename):
+    return read_shard(_shard_header, filename)
+
+
+def merge_shards(model, shards):
+    # transitions of every shard are checked against the declarations, and an
+    # edge (source, action, target) may only be defined in one file
+    n = len(model.states)
+    errors = []
+    keys = []
+    for index, (filename, source, target, action, weight, line, extra_states, extra_actions) in enumerate(shards):
+        for k in np.flatnonzero((source >= n) | (target >= n) | (action >= len(model.actions))):
+            for i in (source[k], target[k]):
+                if i >= n:
+                    errors.append(f'Error: {filename}: undeclared state: {extra_states[i]} (line {line[k]})')
+            if action[k] >= len(model.actions):
+                errors.append(f'Error: {filename}: undeclared action: {extra_actions[action[k]]} (line {line[k]})')
+        edges = (source.astype(np.int64) * (len(model.actions) + 1) + action + 1) * n + target
+        unique, first = np.unique(edges, return_index=True)
+        keys.append((unique, np.full(len(unique), index), first))
+
+    if not errors and keys:
+        edges, owner, first = (np.concatenate(column) for column in zip(*keys))
+        order = np.argsort(edges, kind='stable')
+        edges, owner, first = edges[order], owner[order], first[order]
+        for k in np.flatnonzero(edges[1:] == edges[:-1]):
+            a, b = shards[owner[k]], shards[owner[k + 1]]
+            source, target, action = a[1][first[k]], a[2][first[k]], a[3][first[k]]
+            act = f' [{model.actions[action]}]' if action >= 0 else ''
+            errors.append(f'Error: duplicate transition {model.states[source]}{act} -> {model.states[target]} '
+                          f'in {a[0]} (line {a[5][first[k]]}) and {b[0]} (line {b[5][first[k + 1]]})')
+    if errors:
+        raise Exception('\n'.join(errors))
+    return model
+
+
+def load_shards(paths, workers=None):
+    # the declarations are read first, then the other files in parallel, each
+    # into its own arrays that are checked and appended to the model
+    filenames = shard_files(paths)
+    headers = [filename for filename in filenames if is_header(filename)]
+    if not headers:
+        raise Exception('Error: no file declares the states')
+    model = TemporaryModel()
+    for filename in headers:
+        model.files.append((len(model.store), filename))
+        with open(filename) as f:
+            read_model(f, model, shard=True)
+    header_shard = shard_arrays(', '.join(headers), model)
+
+    tasks = [filename for filename in filenames if filename not in headers]
+    if workers == 1 or len(tasks) <= 1:
+        shards = [read_shard(model, filename) for filename in tasks]
+    else:
+        with process_pool(workers, _init_shard_worker, (model,)) as pool:
+            shards = pool.map(_read_shard, tasks)
+
+    merge_shards(model, [header_shard] + shards)
+    for filename, source, target, action, weight, line, _, _ in shards:
+        model.files.append((len(model.store), filename))
+        model.store.extend(source, target, action, weight, line)
+    if len(model.store) == 0:
+        raise Exception('Error: the model has no transition')
+    return model
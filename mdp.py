@@ -1,171 +1,33 @@
-from antlr4 import *
-from gramLexer import gramLexer
-from gramListener import gramListener
-from gramParser import gramParser
 import numpy as np
-from graphviz import Digraph
-from models import TemporaryModel, MarkovDecisionProcess, MarkovChain
-from matplotlib import pyplot as plt    
-import matplotlib.image as mpimg
+from models import MarkovDecisionProcess
+import loader
+import cache
+import storage
+import batch
 import time
 import sys
+import os
 
-class gramPrintListener(gramListener):
-    def __init__(self, model):
-        self.model = model
-
-    def enterDefstates(self, ctx):
-        if ctx.state_reward_list() is not None:
-            rewards = {}
-            for sr in ctx.state_reward_list().state_reward():
-                state = sr.ID().getText()  
-                reward_val = int(sr.INT().getText()) 
-                rewards[state] = reward_val
-            self.model.states = list(rewards.keys())
-            self.model.state_rewards = rewards
-        elif ctx.state_list() is not None:
-            id_tokens = ctx.state_list().getTokens(gramParser.ID)
-            self.model.states = [token.getText() for token in id_tokens]
-            self.model.state_rewards = {}
-
-            
-    def enterDefactions(self, ctx):
-        self.model.actions = [x.getText() for x in ctx.ID()]
-
-    def enterTransact(self, ctx):
-        ids = [x.getText() for x in ctx.ID()]
-        dep = ids.pop(0)
-        act = ids.pop(0)
-        weights = [int(x.getText()) for x in ctx.INT()]
-        for i in range(len(ids)):
-            self.model.action_transitions.append({
-                'from': dep,
-                'action': act,
-                'to': ids[i],
-                'weight': weights[i]
-            })
-
-    def enterTransnoact(self, ctx):
-        ids = [x.getText() for x in ctx.ID()]
-        dep = ids.pop(0)
-        weights = [int(x.getText()) for x in ctx.INT()]
-        for i in range(len(ids)):
-            self.model.transitions.append({
-                'from': dep,
-                'to': ids[i],
-                'weight': weights[i]
-            })
-
-class MarkovGraph:
-    def __init__(self, model):
-        self.model = model
-        self.visited = set()
-        self.edges_drawn = set()
-        self.fp = Digraph('MarkovPath', filename='MarkovPath')
-        self.fp.attr(rankdir='LR', size='8,5')
-        self.fp.attr('node', shape='circle')
-        plt.ion() 
-        self.fig, self.ax = plt.subplots()
-
-    def plot_complete_graph(self, highlight_intermediate=None, highlight_node=None, highlight_edge=None, highlight_next_state=None):
-        self.fp = Digraph('MarkovPath', filename='MarkovPath')
-        self.fp.attr(rankdir='LR', size='8,5')
-        self.fp.attr('node', shape='circle')
-        for state in self.model.states:
-            fillcolor = 'yellow' if state == highlight_node else 'white'
-            self.fp.node(state, style='filled', fillcolor=fillcolor)
-        for t in self.model.transitions:
-            edge_color = 'black'
-            if highlight_edge and (t['from'] == highlight_edge[0]) and (t['to'] == highlight_edge[1]):
-                edge_color = 'red'
-            label_str = f"({t['weight']})"
-            self.fp.edge(t['from'], t['to'], label=label_str, color=edge_color, fontcolor=edge_color)
-        if hasattr(self.model, 'action_transitions') and self.model.action_transitions:
-            action_groups = {}
-            for t in self.model.action_transitions:
-                if t['action'] == "no_action":
-                    continue
-                key = (t['from'], t['action'])
-                if key not in action_groups:
-                    action_groups[key] = []
-                action_groups[key].append(t)
-            for (from_state, action), transitions in action_groups.items():
-                intermediate_node = f"{from_state}_{action}"
-                node_color = 'red' if highlight_intermediate == intermediate_node else 'black'
-                self.fp.node(intermediate_node, shape='point', width='0.1', color=node_color)
-                self.fp.edge(from_state, intermediate_node,
-                            label=action, arrowhead='none',
-                            color=node_color, fontcolor=node_color)
-                for t in transitions:
-                    edge_color = 'black'
-                    if (highlight_intermediate == intermediate_node) and (highlight_next_state == t['to']):
-                        edge_color = 'red'
-                    weight_str = f"({t['weight']})"
-                    self.fp.edge(intermediate_node, t['to'],
-                                label=weight_str, color=edge_color, fontcolor=edge_color)
-
-        self.fp.render(format='png', cleanup=True)
-        self.update_plot()
-
-    def update_plot(self):
-        image = mpimg.imread('MarkovPath.png')
-        self.ax.clear()
-        self.ax.imshow(image)
-        self.ax.axis('off')
-        plt.draw()
-        plt.pause(0.5)
-
-    def plot_simulation(self):
-        if len(self.model.path) == 1:
-            initial_state = self.model.path[0]
-            self.plot_complete_graph(highlight_node=initial_state)
-            return
-
-        current_state = str(self.model.actual_state)
-        previous_state = self.model.path[-2] if len(self.model.path) > 1 else None
-
-        if hasattr(self.model, 'action_transitions') and self.model.action_transitions:
-            action = getattr(self.model, 'last_action', None)
-            next_state = getattr(self.model, 'last_next_state', None)
-            
-            if previous_state and action == "no_action" and next_state is not None:
-                highlight_edge = (previous_state, current_state)
-                highlight_intermediate = None
-                highlight_next_state = None
-            
-            elif previous_state and action is not None and next_state is not None:
-                highlight_intermediate = f"{previous_state}_{action}"
-                highlight_next_state = next_state
-                highlight_edge = None
-            else:
-                highlight_intermediate = None
-                highlight_next_state = None
-                highlight_edge = None
-
-            self.plot_complete_graph(
-                highlight_intermediate=highlight_intermediate,
-                highlight_node=current_state,
-                highlight_edge=highlight_edge,
-                highlight_next_state=highlight_next_state
-            )
-        else:
-            highlight_edge = (previous_state, current_state) if previous_state else None
-            self.plot_complete_graph(
-                highlight_edge=highlight_edge,
-                highlight_node=current_state
-            )
+def load_temporary_model(filename):
+    # the ANTLR runtime is only imported when a file is actually parsed
+    import antlr_loader
+    return antlr_loader.load_temporary_model(filename)
 
 def main():
-    filename = sys.argv[1]
-    lexer = gramLexer(FileStream(filename))
-    stream = CommonTokenStream(lexer)
-    parser = gramParser(stream)
-    tree = parser.program()
-    temp_model = TemporaryModel()
-    printer = gramPrintListener(temp_model)
-    walker = ParseTreeWalker()
-    walker.walk(printer, tree)
-    model = temp_model.generate_model()
+    if len(sys.argv) > 1 and sys.argv[1] in batch.COMMANDS:
+        sys.exit(batch.main(sys.argv[1:]))
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    filename = paths[0]
+    load = loader.load_temporary_model if '--stream' in options else load_temporary_model
+    if len(paths) > 1 or os.path.isdir(filename):
+        model = loader.load_shards(paths).generate_model()
+    elif filename.endswith('.bin'):
+        model = storage.open_model(filename)
+    elif '--no-cache' in options:
+        model = load(filename).generate_model()
+    else:
+        model = cache.load_model(filename, load)
     print("""Options: 
             1 - Simulate the model
             2 - Verify the properties
@@ -179,7 +41,8 @@ def main():
     if choice == 1:
         print('>>> Simulating model')
         steps = int(input('How many steps do you want to simulate? '))
-        markov_graph = MarkovGraph(model)
+        import viz
+        markov_graph = viz.MarkovGraph(model)
         markov_graph.plot_complete_graph()
         if isinstance(model, MarkovDecisionProcess):
             print("""Simulation mode options:  
@@ -230,25 +93,30 @@ def main():
                     2 - Iterative resolution
                     3 - SMC quantitative resolution
                     4 - SMC qualitative resolution
+                    5 - SMC adaptive quantitative resolution
+                    6 - Interval iteration
                 """)
-            technique = int(input('Which technique do you want to use (1,2, 3, 4 or 5)? '))
-            while technique not in [1, 2, 3, 4, 5]:
-                    print("Invalid technique. Please choose 1,2, 3, 4 or 5.")
-                    technique = int(input('What do you want to do (1,2, 3, 4 or 5)? '))
+            technique = int(input('Which technique do you want to use (1,2, 3, 4, 5 or 6)? '))
+            while technique not in [1, 2, 3, 4, 5, 6]:
+                    print("Invalid technique. Please choose 1,2, 3, 4, 5 or 6.")
+                    technique = int(input('What do you want to do (1,2, 3, 4, 5 or 6)? '))
             if technique == 1:
-                y = model.verify_property_linear_system(property)
-                print(f'Probability: {y}')
+                probabilities = model.verify_property_linear_system(property)
+                for state, probability in probabilities.items():
+                    print(f'Probability from {state}: {probability}')
             elif technique == 2:
                 initial_state = input('Initial State: ')    
-                y = model.verify_property_iterative(property, initial_state)
-                print(f'Probability: {y}')
+                probabilities, report = model.solve_property_iterative(property)
+                print(f'Probability: {probabilities[initial_state]}')
+                print(f"{report['iterations']} iterations, residual {report['residual']}")
             elif technique == 3:
                 gama = model.verify_property_smc_quant(property, 0.01, 0.01)
                 print(f'Probability: {gama}')
             elif technique == 4:
                 theta = float(input('Theta value? '))
                 epsilon = float(input('Epsilon value? '))
-                res = model.verify_property_smc_qual(property, theta, epsilon)
+                res, samples = model.verify_property_smc_qual(property, theta, epsilon)
+                print(f'Simulations used: {samples}')
 
                 if res == 1:
                     print(f'The probability is smaller than {theta}')
@@ -256,11 +124,44 @@ def main():
                     print(f'The probability is bigger than {theta}')
                 else:
                     print('Answer not found')
+            elif technique == 5:
+                gama, (low, high), samples = model.verify_property_smc_adaptive(property, 0.01, 0.01)
+                print(f'Probability: {gama} in [{low}, {high}] ({samples} simulations)')
+            elif technique == 6:
+                initial_state = input('Initial State: ')
+                bounds, report = model.solve_property_interval(property)
+                low, high = bounds[initial_state]
+                print(f'Probability in [{low}, {high}] ({report["iterations"]} iterations)')
         else:
-            y = model.verify_property_linear(property)
-            print(f'Probability: {y}')
+            minimum = input('Maximum or minimum probability (max/min)? ').strip() == 'min'
+            print(""" Techniques:
+                    1 - Linear programming
+                    2 - Interval iteration
+                    3 - Value iteration
+                    4 - Policy iteration
+                """)
+            technique = int(input('Which technique do you want to use (1, 2, 3 or 4)? '))
+            while technique not in [1, 2, 3, 4]:
+                    print("Invalid technique. Please choose 1, 2, 3 or 4.")
+                    technique = int(input('Which technique do you want to use (1, 2, 3 or 4)? '))
+            if technique == 1:
+                probabilities = model.verify_property_linear(property, minimum)
+                for state, probability in probabilities.items():
+                    print(f'Probability from {state}: {probability}')
+            elif technique == 2:
+                bounds, report = model.solve_property_interval(property, minimum=minimum)
+                for state, (low, high) in bounds.items():
+                    print(f'Probability from {state} in [{low}, {high}]')
+                print(f"{report['iterations']} iterations")
+            else:
+                probabilities, scheduler, report = model.solve_property_optimal(
+                    property, 'value' if technique == 3 else 'policy', minimum)
+                for state, probability in probabilities.items():
+                    print(f'Probability from {state}: {probability} (action {scheduler[state]})')
+                print(f"{report['iterations']} iterations")
     elif choice == 3:
-        markov_graph = MarkovGraph(model)
+        import viz
+        markov_graph = viz.MarkovGraph(model)
         markov_graph.plot_complete_graph()
         initial_state = input('Initial State:' )
         target_state = input('Target State: ')
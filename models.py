@@ -1,72 +1,241 @@
 import numpy as np
-from copy import deepcopy
-from scipy.optimize import linprog
+from scipy import sparse
+from solvers import graph_analysis, interval_iteration, policy_iteration, solve, solve_iterative, solve_jacobi, value_iteration
+from simulation import BatchSimulator, ImportanceSampler, TraceRecorder, biased_weights, parallel_count_hits
+
+class TransitionStore:
+    def __init__(self, capacity=1024):
+        # interned names; the ids index the columns below
+        self.state_names = []
+        self.state_ids = {}
+        self.action_names = []
+        self.action_ids = {}
+        self.source = np.empty(capacity, dtype=np.int32)
+        self.target = np.empty(capacity, dtype=np.int32)
+        self.action = np.empty(capacity, dtype=np.int32)   # -1 for transitions without action
+        self.weight = np.empty(capacity, dtype=np.int64)
+        self.line = np.empty(capacity, dtype=np.int32)     # source line, 0 when unknown
+        self.length = 0
+
+    @classmethod
+    def from_records(cls, states, actions, transitions):
+        store = cls(max(len(transitions), 1))
+        for state in states:
+            store.intern_state(state)
+        for action in actions:
+            store.intern_action(action)
+        for t in transitions:
+            store.append(t['from'], t.get('action'), [t['to']], [t['weight']])
+        return store
+
+    def intern_state(self, name):
+        i = self.state_ids.get(name)
+        if i is None:
+            i = self.state_ids[name] = len(self.state_names)
+            self.state_names.append(name)
+        return i
+
+    def intern_action(self, name):
+        i = self.action_ids.get(name)
+        if i is None:
+            i = self.action_ids[name] = len(self.action_names)
+            self.action_names.append(name)
+        return i
+
+    def reserve(self, count):
+        if self.length + count <= len(self.source):
+            return
+        capacity = max(2 * len(self.source), self.length + count)
+        for column in ('source', 'target', 'action', 'weight', 'line'):
+            grown = np.empty(capacity, dtype=getattr(self, column).dtype)
+            grown[:self.length] = getattr(self, column)[:self.length]
+            setattr(self, column, grown)
+
+    def append(self, dep, act, targets, weights, line=0):
+        count = len(targets)
+        self.reserve(count)
+        k = self.length
+        self.line[k:k + count] = line
+        self.source[k:k + count] = self.intern_state(dep)
+        self.action[k:k + count] = -1 if act is None else self.intern_action(act)
+        self.target[k:k + count] = [self.intern_state(t) for t in targets]
+        self.weight[k:k + count] = weights
+        self.length += count
+
+    def extend(self, source, target, action, weight, line):
+        count = len(source)
+        self.reserve(count)
+        k = self.length
+        self.source[k:k + count] = source
+        self.target[k:k + count] = target
+        self.action[k:k + count] = action
+        self.weight[k:k + count] = weight
+        self.line[k:k + count] = line
+        self.length += count
+
+    def append_block(self, sources, act, targets, weights, line=0):
+        count = len(targets)
+        self.reserve(count)
+        k = self.length
+        self.source[k:k + count] = sources
+        self.action[k:k + count] = -1 if act is None else self.intern_action(act)
+        self.target[k:k + count] = targets
+        self.weight[k:k + count] = weights
+        self.line[k:k + count] = line
+        self.length += count
+
+    def columns(self):
+        n = self.length
+        return self.source[:n], self.target[:n], self.action[:n], self.weight[:n]
+
+    def chunks(self):
+        # (offset, source, target, action, weight, line) blocks covering every transition
+        n = self.length
+        yield 0, self.source[:n], self.target[:n], self.action[:n], self.weight[:n], self.line[:n]
+
+    def subset(self, mask):
+        store = TransitionStore(0)
+        store.state_names, store.state_ids = self.state_names, self.state_ids
+        store.action_names, store.action_ids = self.action_names, self.action_ids
+        store.source, store.target, store.action, store.weight = (column[mask] for column in self.columns())
+        store.line = self.line[:self.length][mask]
+        store.length = len(store.source)
+        return store
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        # dictionaries in the original {'from', 'to', 'weight', 'action'} layout
+        for k in range(self.length):
+            record = {'from': self.state_names[self.source[k]], 'to': self.state_names[self.target[k]], 'weight': int(self.weight[k])}
+            if self.action[k] >= 0:
+                record['action'] = self.action_names[self.action[k]]
+            elif len(self.action_names) > 0:
+                record['action'] = 'no_action'
+            yield record
+
 
 class TemporaryModel:
-    def __init__(self):
+    def __init__(self, store=None):
         self.states = []
         self.actions = []
-        self.transitions = []
-        self.action_transitions = []
+        self.store = store if store is not None else TransitionStore()
+        self.state_rewards = {}
+        self.families = {}   # name -> (id of the first member, first index, last index)
+        self.files = []      # (first transition, filename) of every shard, for a model read from several files
         self.model_type = None
 
-    def verify_model(self):
-        self.model_type = 'MDP' if len(self.action_transitions) > 0 else 'MC'
+    def add_states(self, states, rewards=None):
+        if rewards is not None:
+            states = list(rewards.keys())
+            self.state_rewards.update(rewards)
+        # declared states are interned first, so their ids are their positions
+        for state in states:
+            if state not in self.store.state_ids:
+                self.store.intern_state(state)
+                self.states.append(state)
+
+    def add_family(self, name, first, last, reward=None, line=0):
+        if name in self.families:
+            raise Exception(f'Error: family {name} declared twice (line {line})')
+        members = [f'{name}_{i}' for i in range(first, last + 1)]
+        base = len(self.states)
+        self.add_states(members, dict.fromkeys(members, reward) if reward is not None else None)
+        if len(self.states) != base + len(members):
+            raise Exception(f'Error: family {name} redeclares a state (line {line})')
+        self.families[name] = (base, first, last)
+
+    def add_actions(self, actions):
+        for action in actions:
+            if action not in self.actions:
+                self.actions.append(action)
+                self.store.intern_action(action)
+
+    def add_transitions(self, dep, act, targets, weights, line=0):
+        self.store.append(dep, act, targets, weights, line)
+
+    def family_ids(self, name, indices, line):
+        if name not in self.families:
+            raise Exception(f'Error: undeclared family: {name} (line {line})')
+        base, first, last = self.families[name]
+        if indices[0] < first or indices[-1] > last:
+            raise Exception(f'Error: index out of the range {first}..{last} of family {name} (line {line})')
+        return base + (indices - first)
+
+    def add_template(self, family, first, last, act, targets, weights, line=0):
+        # targets are (state, None) for a fixed state or (family, offset) for
+        # the member at index i + offset; expanded straight into the store columns
+        indices = np.arange(first, last + 1)
+        if len(indices) == 0:
+            return
+        sources = self.family_ids(family, indices, line)
+        columns = []
+        for name, offset in targets:
+            if offset is None:
+                columns.append(np.full(len(indices), self.store.intern_state(name)))
+            else:
+                columns.append(self.family_ids(name, indices + offset, line))
+        self.store.append_block(
+            np.repeat(sources, len(targets)), act, np.column_stack(columns).ravel(), np.tile(weights, len(indices)), line)
 
-        for transition in self.transitions:
-            if transition['from'] not in self.states:
-                raise Exception(f'Error: undeclared state: {transition["from"]}')
-            if transition['to'] not in self.states:
-                raise Exception(f'Error: undeclared state: {transition["to"]}')
-            
-        if self.model_type == 'MDP':
-            for transition in self.action_transitions:
-                if transition['from'] not in self.states:
-                    raise Exception(f'Error: undeclared state: {transition["from"]}')
-                if transition['to'] not in self.states:
-                    raise Exception(f'Error: undeclared state: {transition["to"]}')
+    def verify_model(self):
+        store = self.store
+        n = len(self.states)
 
+        starts = np.array([start for start, _ in self.files], dtype=np.int64)
+
+        def located(message, position, line):
+            if self.files:
+                filename = self.files[np.searchsorted(starts, position, side='right') - 1][1]
+                message = f'Error: {filename}: {message.removeprefix("Error: ")}'
+            return f'{message} (line {line})' if line > 0 else message
+
+        # every problem is collected, in the order of the transitions
+        errors = []
+        has_action = False
+        action_states = np.zeros(n, dtype=bool)
+        out_degree = np.zeros(n, dtype=np.int64)
+        for offset, source, target, action, weight, line in store.chunks():
+            declared = source < n
+            with_action = action >= 0
+            has_action = has_action or bool(with_action.any())
+            action_states[source[with_action & declared]] = True
+            out_degree += np.bincount(source[declared], minlength=n)
+            for k in np.flatnonzero((source >= n) | (target >= n)):
+                if source[k] >= n:
+                    errors.append((offset + k, located(f'Error: undeclared state: {store.state_names[source[k]]}', offset + k, line[k])))
+                if target[k] >= n:
+                    errors.append((offset + k, located(f'Error: undeclared state: {store.state_names[target[k]]}', offset + k, line[k])))
+            for k in np.flatnonzero(action >= len(self.actions)):
+                errors.append((offset + k, located(f'Error: undeclared action: {store.action_names[action[k]]}', offset + k, line[k])))
+        self.model_type = 'MDP' if has_action else 'MC'
 
-            for transition in self.action_transitions:
-                if transition["action"] not in self.actions:
-                    raise Exception(f'Error: undeclared action: {transition["action"]}')
-                
-            action_states = set()
-            for transition in self.action_transitions:
-                action_states.add(transition["from"])
-            
-            for transition in self.transitions:
-                if transition['from'] in action_states:
-                    raise Exception(f'Error: transitions with and without actions leaving state {transition["from"]}')
-            
-            for t in self.transitions:
-                self.action_transitions.append({'from': t['from'],'to': t['to'],'weight': t['weight'],'action': 'no_action'})
-            
-            for state in self.states:
-                there_is_transition = False
-                for t in self.transitions:
-                    if t['from'] == state:
-                        there_is_transition = True
-                        break
-                if not there_is_transition and state not in action_states:
-                    self.transitions.append({'from': state, 'to': state, 'weight': 1})
-        
-        else:
-            for state in self.states:
-                there_is_transition = False
-                for t in self.transitions:
-                    if t['from'] == state:
-                        there_is_transition = True
-                        break
-                if not there_is_transition:
-                    self.transitions.append({'from': state, 'to': state, 'weight': 1})
+        if self.model_type == 'MDP':
+            reported = np.zeros(n, dtype=bool)
+            for offset, source, target, action, weight, line in store.chunks():
+                mixed = np.flatnonzero((action < 0) & (source < n))
+                mixed = mixed[action_states[source[mixed]] & ~reported[source[mixed]]]
+                _, first = np.unique(source[mixed], return_index=True)
+                for k in mixed[np.sort(first)]:
+                    reported[source[k]] = True
+                    errors.append((offset + k, located(f'Error: transitions with and without actions leaving state {store.state_names[source[k]]}', offset + k, line[k])))
+
+        if errors:
+            errors.sort(key=lambda error: error[0])
+            raise Exception('\n'.join(message for _, message in errors))
+
+        # states without any outgoing transition get a self-loop, added once
+        # every transition above has been read
+        for state in np.flatnonzero(out_degree == 0):
+            store.append(self.states[state], None, [self.states[state]], [1])
                 
         return self.model_type
             
 
     def generate_model(self):
         if self.verify_model() == 'MC':
-            model = MarkovChain(self.states, self.transitions)
+            model = MarkovChain(self.states, self.store)
             model.state_rewards = self.state_rewards  
             return model
         
@@ -74,117 +243,374 @@ class TemporaryModel:
             model = MarkovDecisionProcess(
                 self.states,
                 self.actions,
-                self.transitions,
-                self.action_transitions
+                self.store.subset(self.store.action[:len(self.store)] < 0),
+                self.store
             )
             model.state_rewards = self.state_rewards  
             return model
 
+class CompiledModel:
+    def __init__(self, states, actions, indptr, indices, weights, choice_offsets=None, choice_actions=None,
+                 alias_probability=None, alias=None, probabilities=None):
+        self.states = states
+        self.actions = actions
+        self.state_ids = {state: i for i, state in enumerate(states)}
+        self.action_ids = {action: i for i, action in enumerate(actions)}
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        # None for a Markov chain, otherwise the rows are the choices grouped by state
+        self.choice_offsets = choice_offsets
+        self.choice_actions = choice_actions
+
+        rows = len(indptr) - 1
+        if probabilities is None:
+            row_of_entry = np.repeat(np.arange(rows), np.diff(indptr))
+            totals = np.bincount(row_of_entry, weights=weights, minlength=rows)
+            probabilities = weights / totals[row_of_entry]
+        self.probabilities = probabilities
+        self.transition_matrix = sparse.csr_matrix((self.probabilities, indices, indptr), shape=(rows, len(states)))
+        if alias is None:
+            self.build_alias_tables()
+        else:
+            self.alias_probability = alias_probability
+            self.alias = alias
+
+    @staticmethod
+    def build_csr(rows, columns, weights, shape):
+        matrix = sparse.csr_matrix((weights, (rows, columns)), shape=shape, dtype=np.int64)
+        matrix.sum_duplicates()
+        return matrix.indptr.astype(np.int64), matrix.indices.astype(np.int32), matrix.data
+
+    @classmethod
+    def from_transitions(cls, states, transitions):
+        if not isinstance(transitions, TransitionStore):
+            transitions = TransitionStore.from_records(states, [], transitions)
+        n = len(states)
+        rows, columns, _, weights = transitions.columns()
+        return cls(states, [], *cls.build_csr(rows, columns, weights, (n, n)))
+
+    @classmethod
+    def from_action_transitions(cls, states, actions, action_transitions):
+        if not isinstance(action_transitions, TransitionStore):
+            action_transitions = TransitionStore.from_records(states, actions, action_transitions)
+        n = len(states)
+        sources, columns, action_ids, weights = action_transitions.columns()
+        action_ids = np.where(action_ids < 0, actions.index('no_action'), action_ids)
+
+        # number the (state, action) pairs so that the choices of a state are contiguous
+        keys = sources.astype(np.int64) * len(actions) + action_ids
+        choice_keys, rows = np.unique(keys, return_inverse=True)
+        choice_states = choice_keys // len(actions)
+
+        choice_actions = (choice_keys % len(actions)).astype(np.int32)
+        choice_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(choice_states, minlength=n), out=choice_offsets[1:])
+
+        indptr, indices, data = cls.build_csr(rows, columns, weights, (len(choice_keys), n))
+        return cls(states, actions, indptr, indices, data, choice_offsets, choice_actions)
+
+    def transition_store(self):
+        # the transitions back in store form, one per CSR entry
+        store = TransitionStore(0)
+        for state in self.states:
+            store.intern_state(state)
+        rows = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        if self.choice_offsets is None:
+            store.source = rows.astype(np.int32)
+            store.action = np.full(len(rows), -1, dtype=np.int32)
+        else:
+            for action in self.actions:
+                if action != 'no_action':
+                    store.intern_action(action)
+            store.source = self.choice_states()[rows].astype(np.int32)
+            store.action = self.choice_actions[rows].astype(np.int32)
+            store.action[store.action == self.action_ids.get('no_action', -1)] = -1
+        store.target = np.asarray(self.indices, dtype=np.int32)
+        store.weight = np.asarray(self.weights, dtype=np.int64)
+        store.line = np.zeros(len(rows), dtype=np.int32)
+        store.length = len(rows)
+        return store
+
+    def build_alias_tables(self):
+        self.alias_probability = np.ones(len(self.indices))
+        self.alias = np.zeros(len(self.indices), dtype=np.int32)
+        fill_alias_tables(self.indptr, self.weights, self.alias_probability, self.alias)
+
+    def sample(self, row, rng):
+        start = self.indptr[row]
+        u = rng.random() * (self.indptr[row + 1] - start)
+        k = int(u)
+        if u - k >= self.alias_probability[start + k]:
+            k = self.alias[start + k]
+        return self.indices[start + k]
+
+    def sample_entries(self, rows, rng):
+        starts = self.indptr[rows]
+        u = rng.random(len(rows)) * (self.indptr[rows + 1] - starts)
+        k = u.astype(np.int64)
+        entries = starts + k
+        return np.where(u - k < self.alias_probability[entries], entries, starts + self.alias[entries])
+
+    def sample_rows(self, rows, rng):
+        return self.indices[self.sample_entries(rows, rng)]
+
+    def successors(self, row):
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def row_probabilities(self, row):
+        return self.probabilities[self.indptr[row]:self.indptr[row + 1]]
+
+    def choices(self, state_id):
+        return range(self.choice_offsets[state_id], self.choice_offsets[state_id + 1])
+
+    def choice(self, state_id, action_id):
+        for choice in self.choices(state_id):
+            if self.choice_actions[choice] == action_id:
+                return choice
+        return None
+
+    def choice_states(self):
+        return np.repeat(np.arange(len(self.states)), np.diff(self.choice_offsets))
+
+
+def fill_alias_tables(indptr, weights, alias_probability, alias):
+    # Vose alias method on the integer weights: entry k of a row keeps its own
+    # successor with probability alias_probability[k], otherwise it takes the
+    # successor at offset alias[k] of the same row. The tables come in filled
+    # with ones and zeros, which is already right for one-successor and uniform rows
+    degrees = np.diff(indptr)
+    rows = np.flatnonzero(degrees > 1)
+    if len(rows) == 0:
+        return
+    lengths = degrees[rows].astype(np.int64)
+    offsets = np.zeros(len(rows), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    rank = np.repeat(np.arange(len(rows)), lengths)
+    position = np.arange(len(rank)) - offsets[rank]
+    entries = np.asarray(indptr[rows], dtype=np.int64)[rank] + position
+
+    # exact for integer weights, plain floating point for biased ones
+    w = np.asarray(weights[entries])
+    total = np.add.reduceat(w, offsets)[rank]
+    scaled = w * lengths[rank]
+    # the entries of a uniform row are all heavies with no excess, left as they are
+    light = scaled < total
+    if not light.any():
+        return
+    gap = np.where(light, total - scaled, scaled - total)
+
+    # The sweep of Vose's pairing in closed form: the lights are filled in row
+    # order, each one by the heavy in use, and a heavy is in use until the
+    # deficits of the lights filled so far pass its excess, running from the
+    # first heavy. A light starting at deficit d is filled by the first heavy
+    # whose running excess passes d; a heavy whose running excess x falls inside
+    # a light is left short by the rest of that light, filled by the next heavy.
+    # The running sums go across the rows, which line up exactly for integer
+    # weights since every row has as much excess as deficit; the clipping keeps
+    # the rounding of biased weights inside the row
+    deficit_end = np.cumsum(np.where(light, gap, 0))
+    excess_end = np.cumsum(np.where(light, 0, gap))
+    lights, heavies = np.flatnonzero(light), np.flatnonzero(~light)
+    deficit_start = deficit_end[lights] - gap[lights]
+    first_heavy = np.searchsorted(rank[heavies], np.arange(len(rows)), side='left')
+    last_heavy = np.searchsorted(rank[heavies], np.arange(len(rows)), side='right') - 1
+    first_light = np.searchsorted(rank[lights], np.arange(len(rows)), side='left')
+    last_light = np.searchsorted(rank[lights], np.arange(len(rows)), side='right') - 1
+
+    row = rank[lights]
+    filler = np.clip(np.searchsorted(excess_end[heavies], deficit_start, side='right'), first_heavy[row], last_heavy[row])
+    alias_probability[entries[lights]] = scaled[lights] / total[lights]
+    alias[entries[lights]] = position[heavies[filler]]
+
+    row = rank[heavies]
+    # the last light of the row starting below x, none when x is the very start of the row
+    inside = np.searchsorted(deficit_start, excess_end[heavies], side='left') - 1
+    started = inside >= first_light[row]
+    inside = np.clip(inside, first_light[row], last_light[row])
+    short = deficit_end[lights[inside]] - excess_end[heavies]
+    kept = started & (short > 0) & (np.arange(len(heavies)) < last_heavy[row])
+    g = heavies[kept]
+    alias_probability[entries[g]] = (total[g] - short[kept]) / total[g]
+    alias[entries[g]] = position[heavies[np.flatnonzero(kept) + 1]]
+
+
+class CompiledTransitions:
+    # the transitions of a compiled model, rebuilt only when iterated (for drawing)
+    def __init__(self, compiled, without_actions=False):
+        self.compiled = compiled
+        self.without_actions = without_actions
+        self.store = None
+
+    def records(self):
+        if self.store is None:
+            self.store = self.compiled.transition_store()
+            if self.without_actions:
+                self.store = self.store.subset(self.store.action[:len(self.store)] < 0)
+        return self.store
+
+    def __len__(self):
+        return len(self.records())
+
+    def __iter__(self):
+        return iter(self.records())
+
+
 class MarkovChain:
-    def __init__(self, states, transitions, simulation_trace=True):
+    def __init__(self, states, transitions, simulation_trace=True, seed=None, record_path=True, compiled=None,
+                 trace_file=None):
         self.states = states
         self.transitions = transitions
-        self.path = []
         self.simulation_trace = simulation_trace
-        self.build_transition_matrix()
+        self.rng = np.random.default_rng(seed)
+        self.build_transition_matrix(compiled)
+        # trace_file streams the simulated paths to disk instead of keeping them in memory
+        self.recorder = TraceRecorder(self.states, enabled=record_path, filename=trace_file)
+
+    @classmethod
+    def from_compiled(cls, compiled, state_rewards=None, seed=None, trace_file=None):
+        model = cls(compiled.states, CompiledTransitions(compiled), seed=seed, compiled=compiled, trace_file=trace_file)
+        model.state_rewards = state_rewards if state_rewards is not None else {}
+        return model
+
+    @property
+    def path(self):
+        return self.recorder
 
     def trace(self, message=''):
         if self.simulation_trace:
             print(message)
 
-    def build_transition_matrix(self):
-        self.transition_matrix = []
-        for _ in range(len(self.states)):
-            matrix_line = [0] * len(self.states)
-            self.transition_matrix.append(matrix_line)
-        for state in self.states:
-            possible_states, probabilities = self.allowed_transitions(state)
-            for possible_state, prob in zip(possible_states, probabilities):
-                self.transition_matrix[self.states.index(state)][self.states.index(possible_state)] = prob
+    def build_transition_matrix(self, compiled=None):
+        self.compiled = compiled if compiled is not None else CompiledModel.from_transitions(self.states, self.transitions)
+        self.state_ids = self.compiled.state_ids
+        self.transition_matrix = self.compiled.transition_matrix
+
+    def dense_transition_matrix(self):
+        return self.transition_matrix.toarray()
 
     def simulation_init(self):
         self.actual_state = self.states[0]
-        self.path = [self.actual_state]
+        self.recorder.reset(0)
         self.trace(f'>>> Simulation initialized: initial state: {self.actual_state}')
 
     def simulation_step(self):
-        possible_states, probabilities = self.allowed_transitions(self.actual_state)
-        self.print_allowed_transitions(possible_states, probabilities)
-        next_state = np.random.choice(possible_states, p=probabilities)
+        if self.simulation_trace:
+            self.print_allowed_transitions(*self.allowed_transitions(self.actual_state))
+        next_state = self.states[self.compiled.sample(self.state_ids[self.actual_state], self.rng)]
         self.trace(f'>>> Transition chosen: {self.actual_state} -> {next_state}')
         self.actual_state = next_state
-        self.path.append(self.actual_state)
+        self.recorder.append(self.state_ids[next_state])
         return self.actual_state
 
-    def verify_property_linear_system(self, property):
-        transition_matrix = np.array(self.transition_matrix)
-        property_index = self.states.index(property)
-        indices_to_delete = [property_index]
+    def linear_system(self, property):
+        # (I - A) x = b over the states in keep, the others being decided by
+        # graph analysis: values holds 1 for them when they surely reach property
+        targets = self.target_indices(property)
+        _, one, keep = graph_analysis(self.compiled, targets)
 
-        for i in range(transition_matrix.shape[0]):
-            if i != property_index and transition_matrix[i, i] == 1:
-                indices_to_delete.append(i)
+        A_temp = self.transition_matrix[keep]
+        A = A_temp[:, keep]
+        b = A_temp @ one.astype(np.float64)
+        return (sparse.identity(A.shape[0], format='csr') - A).tocsc(), b, keep, one.astype(np.float64)
 
-        A_temp = np.delete(transition_matrix, indices_to_delete, axis=0)
-        A = np.delete(A_temp, indices_to_delete, axis=1)
-        b = np.delete(transition_matrix[:, property_index], indices_to_delete)
-        y = np.linalg.solve(np.identity(A.shape[0]) - A, b)
+    def verify_property_linear_system(self, property, method='auto'):
+        # probability of reaching property from every state, by state name
+        matrix, b, keep, values = self.linear_system(property)
+        values[keep] = solve(matrix, b, method)
 
-        return y[0]
-    
+        return dict(zip(self.states, values.tolist()))
 
-    def verify_property_iterative(self, target_states, initial_state, epsilon=1e-4, max_iterations=10000):
+    def target_indices(self, target_states):
         if isinstance(target_states, str):
             if ',' in target_states:
                 target_states = [s.strip() for s in target_states.split(',')]
             else:
                 target_states = [target_states]
         for t in target_states:
-            if t not in self.states:
+            if t not in self.state_ids:
                 raise Exception(f"Error: state '{t}' not declared")
-        target_indices = [self.states.index(t) for t in target_states]
-        n = len(self.states)
-        
-        if not hasattr(self, 'transition_matrix'):
-            self.build_transition_matrix()
-        P = np.array(self.transition_matrix)
-        
-        p = np.zeros(n)
-        for idx in target_indices:
-            p[idx] = 1.0
-
-        for it in range(max_iterations):
-            p_new = np.copy(p)
-            for i in range(n):
-                if i in target_indices or np.isclose(P[i, i], 1.0):
-                    continue
-                p_new[i] = np.dot(P[i, :], p)
-            for idx in target_indices:
-                p_new[idx] = 1.0
-            if np.max(np.abs(p_new - p)) < epsilon:
-                p = p_new
-                break
-            p = p_new
-        return p[self.states.index(initial_state)]
-
-    def verify_property_smc_quant(self, property, epsilon, delta, number_steps=20):
+        return [self.state_ids[t] for t in target_states]
+
+    def solve_property_iterative(self, target_states, epsilon=1e-4, max_iterations=10000, method='jacobi', omega=1.0,
+                                 relative=False):
+        # probabilities of every state by name, and the iterations, last difference and residual.
+        # Jacobi runs on the transition matrix itself, Gauss-Seidel and SOR on the reduced system
+        if method == 'jacobi':
+            _, one, maybe = graph_analysis(self.compiled, self.target_indices(target_states))
+            values, report = solve_jacobi(self.transition_matrix, one, maybe, epsilon, relative, max_iterations)
+        else:
+            matrix, b, keep, values = self.linear_system(target_states)
+            values[keep], report = solve_iterative(matrix, b, method, omega, epsilon, relative, max_iterations)
+        return dict(zip(self.states, values.tolist())), report
+
+    def verify_property_iterative(self, target_states, initial_state, epsilon=1e-4, max_iterations=10000, method='jacobi',
+                                  omega=1.0, relative=False):
+        probabilities, _ = self.solve_property_iterative(target_states, epsilon, max_iterations, method, omega, relative)
+        return probabilities[initial_state]
+
+    def solve_property_interval(self, target_states, epsilon=1e-6, relative=False, max_iterations=100000, minimum=False):
+        # sound bounds (lower, upper) of every state by name, Pmin instead of Pmax
+        # with minimum=True for an MDP, and the iterations and final gap
+        lower, upper, report = interval_iteration(self.compiled, self.target_indices(target_states), minimum, epsilon,
+                                                  relative, max_iterations)
+        return dict(zip(self.states, zip(lower.tolist(), upper.tolist()))), report
+
+    def verify_property_smc_quant(self, property, epsilon, delta, number_steps=20, workers=None, seed=None):
+        # the sample count of the original tool: by Hoeffding, precision sqrt(2) epsilon
+        # with confidence 1 - delta (verify_property_smc_adaptive gives precision epsilon)
         N = np.ceil( (np.log(2) - np.log(delta)) / (2*epsilon)**2 )
-        count = 0
-        self.simulation_trace = False
-        for k in range(int(N)):
-            is_property_verified = False
-            self.simulation_init()
-            i = 0
-            while not is_property_verified and i < number_steps:
-                is_property_verified = (self.actual_state == property)
-                self.simulation_step()
-                i += 1
-            if is_property_verified:
-                count += 1
-        self.simulation_trace = True
+        targets = self.target_indices(property)
+        if workers is None and seed is None:
+            simulator = BatchSimulator(self.compiled, self.rng)
+            count = simulator.count_hits(0, targets, int(N), number_steps)
+        else:
+            # the chunks of a root seed give the same count in one process or several
+            count = parallel_count_hits(self.compiled, 0, targets, int(N), number_steps, seed=seed, workers=workers or 1)
         gama = count / N
         return gama
     
+    def verify_property_smc_adaptive(self, property, epsilon, delta, number_steps=20, batch_size=1000):
+        # Clopper-Pearson intervals checked after 1, 2, 4, ... batches; the k-th
+        # check uses confidence delta / (2 k (k + 1)) so that all of them hold
+        # together with probability 1 - delta / 2. The other delta / 2 pays for
+        # the Hoeffding sample count, which caps the number of simulations: more
+        # than verify_property_smc_quant draws, whose precision is only sqrt(2) epsilon
+        from scipy.special import betaincinv
+        N_max = int(np.ceil(np.log(4 / delta) / (2 * epsilon ** 2)))
+        simulator = BatchSimulator(self.compiled, self.rng)
+        targets = self.target_indices(property)
+        count = 0
+        N = 0
+        k = 0
+        while True:
+            k += 1
+            size = min(batch_size * 2 ** (k - 1), N_max) - N
+            count += simulator.count_hits(0, targets, size, number_steps)
+            N += size
+            gama = count / N
+            if N == N_max:
+                return gama, (max(gama - epsilon, 0.0), min(gama + epsilon, 1.0)), N
+            delta_k = delta / (2 * k * (k + 1))
+            low = betaincinv(count, N - count + 1, delta_k / 2) if count > 0 else 0.0
+            high = betaincinv(count + 1, N - count, 1 - delta_k / 2) if count < N else 1.0
+            if high - gama <= epsilon and gama - low <= epsilon:
+                return gama, (float(low), float(high)), N
+
+    def verify_property_smc_importance(self, property, number_paths, delta=0.01, number_steps=20, bias=0.5, weights=None):
+        # weights, aligned with self.compiled.weights, replaces the automatic bias
+        targets = self.target_indices(property)
+        if weights is None:
+            weights = biased_weights(self.compiled, targets, bias)
+        biased = CompiledModel(self.states, [], self.compiled.indptr, self.compiled.indices, np.asarray(weights, dtype=np.float64))
+        if np.any((biased.probabilities == 0) & (self.compiled.probabilities > 0)):
+            raise Exception('Error: the biased distribution must keep every transition of the model')
+        sampler = ImportanceSampler(self.compiled, biased, self.rng)
+        gama, variance = sampler.estimate(0, targets, number_paths, number_steps)
+        from scipy.special import ndtri
+        half_width = ndtri(1 - delta / 2) * np.sqrt(variance)
+        return float(gama), (float(max(gama - half_width, 0.0)), float(min(gama + half_width, 1.0))), float(variance)
+
     def verify_property_smc_qual(
             self, 
             property, 
@@ -192,64 +618,50 @@ class MarkovChain:
             epsilon, 
             alpha=0.01, 
             beta=0.01, 
-            max_simulations=10000, 
-            max_steps_per_simulation=1000):
+            max_simulations=None, 
+            max_steps_per_simulation=1000,
+            batch_size=100,
+            max_batch_size=10000):
         
         gamma1 = theta - epsilon
         gamma0 = theta + epsilon
+        if not 0 < gamma1 < gamma0 < 1:
+            raise Exception(f'Error: indifference region [{gamma1}, {gamma0}] must lie inside (0, 1)')
 
-        A = (1 - beta) / alpha
-        B = beta / (1 - alpha)
+        # log of the ratio Rm and of its bounds A and B
+        log_A = np.log((1 - beta) / alpha)
+        log_B = np.log(beta / (1 - alpha))
+        log_success = np.log(gamma1 / gamma0)
+        log_failure = np.log((1 - gamma1) / (1 - gamma0))
 
         m = 0   # total number of simulations
-        dm = 0  # number of simulations accepted
+        log_Rm = 0.0
 
-        self.simulation_trace = False
-        hypothesis_accepted = False
-
-
-        while not hypothesis_accepted and m < max_simulations:
-            is_property_verified = False
-            self.simulation_init()
-            i = 0
-
-            while not is_property_verified and i < max_steps_per_simulation:
-                is_property_verified = (self.actual_state == property)
-                self.simulation_step()
-                i += 1
-            
-            if is_property_verified:
-                dm += 1
+        simulator = BatchSimulator(self.compiled, self.rng)
+        targets = self.target_indices(property)
 
-            m += 1
-            Rm = ( (gamma1 ** dm) * (1 - gamma1) ** (m - dm) ) / ( (gamma0 ** dm) * (1 - gamma0) ** (m - dm) )
-            if Rm >= A or Rm <= B:
-                hypothesis_accepted = True
+        # the outcomes of a batch are replayed one by one, so the test stops at
+        # the same sample as a purely sequential one would
+        while max_simulations is None or m < max_simulations:
+            size = batch_size if max_simulations is None else min(batch_size, max_simulations - m)
+            hits = simulator.reachability(0, targets, size, max_steps_per_simulation)
+            log_ratios = log_Rm + np.cumsum(np.where(hits, log_success, log_failure))
+            crossing = np.flatnonzero((log_ratios >= log_A) | (log_ratios <= log_B))
+            if len(crossing) > 0:
+                m += crossing[0] + 1
+                log_Rm = log_ratios[crossing[0]]
+                return (1 if log_Rm >= log_A else 0), int(m)
+            m += size
+            log_Rm = log_ratios[-1]
+            batch_size = min(2 * batch_size, max_batch_size)
 
-
-            if m % 100 == 0:
-                print(f'>>> [LOG] Simulation {m} - Rm {Rm} - A {A} - B {B}')
-
-        self.simulation_trace = True
-
-        if hypothesis_accepted and Rm >= A:
-            return 1
-        elif hypothesis_accepted and Rm < B:
-            return 0
-        else:
-            return -1
+        return -1, int(m)
 
 
     def allowed_transitions(self, state):
-        possible_states = []
-        probabilities = []
-        for transition in self.transitions:
-            if transition['from'] == state:
-                possible_states.append(transition['to'])
-                probabilities.append(transition['weight'])
-        probabilities = np.array(probabilities)
-        probabilities = probabilities / np.sum(probabilities)
-        return possible_states, probabilities
+        i = self.state_ids[state]
+        possible_states = [self.states[j] for j in self.compiled.successors(i)]
+        return possible_states, self.compiled.row_probabilities(i)
 
     def print_allowed_transitions(self, possible_states, probabilities):
         self.trace('>>> Possible Transitions')
@@ -273,10 +685,7 @@ class MarkovChain:
                 if current_state in target_states:
                     reached_target = True
                     break  
-                succ, probs = self.allowed_transitions(current_state)
-                if not succ:
-                    break
-                next_state = np.random.choice(succ, p=probs)
+                next_state = self.states[self.compiled.sample(self.state_ids[current_state], self.rng)]
                 if next_state != current_state:
                     cumulative_reward += self.state_rewards.get(current_state, 0)
                 current_state = next_state
@@ -287,122 +696,122 @@ class MarkovChain:
 
    
 class MarkovDecisionProcess(MarkovChain):
-    def __init__(self, states, actions, transitions, action_transitions):
+    def __init__(self, states, actions, transitions, action_transitions, seed=None, record_path=True, compiled=None,
+                 trace_file=None):
         self.actions = actions
         self.actions.append('no_action')
         self.action_transitions = action_transitions
-        super().__init__(states, transitions)
+        super().__init__(states, transitions, seed=seed, compiled=compiled)
+        self.recorder = TraceRecorder(self.states, self.actions, enabled=record_path, filename=trace_file)
         self.last_action = None          
         self.last_next_state = None      
 
+    @classmethod
+    def from_compiled(cls, compiled, state_rewards=None, seed=None, trace_file=None):
+        actions = [action for action in compiled.actions if action != 'no_action']
+        model = cls(compiled.states, actions, CompiledTransitions(compiled, without_actions=True),
+                    CompiledTransitions(compiled), seed=seed, compiled=compiled, trace_file=trace_file)
+        model.state_rewards = state_rewards if state_rewards is not None else {}
+        return model
+
     def simulation_init(self):
         super().simulation_init()
         next_actions = self.possible_actions(self.actual_state)
         return next_actions
 
-    def build_transition_matrix(self):
-        state_action_pairs = []
-
-        for state in self.states:
-            actions = list(self.possible_actions(state))
-            for action in actions:
-                state_action_pairs.append((state, action))
-        
-        transition_matrix = np.empty((0, len(self.states)))
-        for (state, action) in state_action_pairs:
-            transition_matrix_line = np.zeros(len(self.states))
-            possible_states, probabilities = self.allowed_transitions(state, action)
-            for possible_state, prob in zip(possible_states, probabilities):
-                transition_matrix_line[self.states.index(possible_state)] = prob
-            transition_matrix = np.vstack((transition_matrix, transition_matrix_line))
-    
-        self.transition_matrix = transition_matrix
-        self.actions_by_state = state_action_pairs
-
-    def verify_property_linear(self, property):
-        transition_matrix = deepcopy(self.transition_matrix)
-
-        property_index = self.states.index(property)
-
-        rows_to_delete = []
-        columns_to_delete = [property_index]
-
-        # searching for indexes to delete
-        for i in range(len(self.actions_by_state)):
-            if self.actions_by_state[i][0] == property:
-                rows_to_delete.append(i)
-
-        A_temp = np.delete(transition_matrix, rows_to_delete, axis=0)
-
-        b = deepcopy(A_temp[:, property_index])
-
-        A = -1*np.delete(A_temp, columns_to_delete, axis=1)
-
-        actions_states_mapping = np.delete(np.array(self.actions_by_state), rows_to_delete, axis=0)
-
-        states_without_property = deepcopy(self.states)
-        states_without_property.remove(property)
-
-        for i in range(len(actions_states_mapping)):
-            state, action = actions_states_mapping[i]
-            A[i, states_without_property.index(state)] += 1 
-
-
-        for i, state in enumerate(states_without_property):
-            if state != property:
-                line1 = np.zeros(A.shape[1])
-                line1[i] = -1
-                line2 = np.zeros(A.shape[1])
-                line2[i] = 1
-                A = np.vstack((A, line1))
-                A = np.vstack((A, line2))
-
-                b = np.append(b, [-1])
-                b = np.append(b, [0])
-
-        c = np.ones(A.shape[1])
-
-        res = linprog(c, A_ub=-1*A, b_ub=-1*b, method='highs')
-
-        return res.x[0]
-
+    def build_transition_matrix(self, compiled=None):
+        if compiled is None:
+            compiled = CompiledModel.from_action_transitions(self.states, self.actions, self.action_transitions)
+        self.compiled = compiled
+        self.state_ids = self.compiled.state_ids
+        self.action_ids = self.compiled.action_ids
+        self.transition_matrix = self.compiled.transition_matrix
+        self.choice_offsets = self.compiled.choice_offsets
+        self.choice_actions = self.compiled.choice_actions
+
+    def verify_property_linear(self, property, minimum=False):
+        # probability of reaching property from every state by name, under the
+        # maximizing scheduler, or the minimizing one with minimum=True
+        targets = self.target_indices(property)
+        _, one, maybe = graph_analysis(self.compiled, targets, minimum)
+        values = one.astype(np.float64)
+        if not maybe.any():
+            return dict(zip(self.states, values.tolist()))
+
+        # one constraint per choice of an undecided state:
+        # x_s - sum_t P[c, t] x_t >= sum of P[c, t] over the states t surely reaching property
+        # (<= for the minimum), the least solution for Pmax and the greatest for Pmin
+        choice_states = self.compiled.choice_states()
+        rows_to_keep = maybe[choice_states]
+        A_temp = self.transition_matrix[rows_to_keep]
+
+        b = A_temp @ values
+
+        column_of_state = np.cumsum(maybe) - 1
+        variables = int(maybe.sum())
+        selection = sparse.csr_matrix(
+            (np.ones(A_temp.shape[0]), (np.arange(A_temp.shape[0]), column_of_state[choice_states[rows_to_keep]])),
+            shape=(A_temp.shape[0], variables))
+        A = selection - A_temp[:, maybe]
+
+        c = np.ones(variables)
+
+        from scipy.optimize import linprog
+        if minimum:
+            res = linprog(-1*c, A_ub=A, b_ub=b, bounds=(0, 1), method='highs')
+        else:
+            res = linprog(c, A_ub=-1*A, b_ub=-1*b, bounds=(0, 1), method='highs')
+        values[maybe] = res.x
+
+        return dict(zip(self.states, values.tolist()))
+
+    def solve_property_optimal(self, property, method='value', minimum=False, epsilon=1e-6, relative=False,
+                               max_iterations=100000, solver='auto'):
+        # probabilities of every state by name under the optimal scheduler, the
+        # action it picks in every state and the report of value or policy iteration
+        targets = self.target_indices(property)
+        if method == 'value':
+            values, scheduler, report = value_iteration(self.compiled, targets, minimum, epsilon, relative, max_iterations)
+        elif method == 'policy':
+            values, scheduler, report = policy_iteration(self.compiled, targets, minimum, solver, max_iterations)
+        else:
+            raise Exception(f'Error: unknown method {method}, expected value or policy')
+        actions = self.compiled.choice_actions[scheduler]
+        return (dict(zip(self.states, values.tolist())),
+                {state: self.compiled.actions[a] for state, a in zip(self.states, actions)}, report)
 
     def allowed_transitions(self, state, action):
-        possible_states = []
-        probabilities = []
-        for transition in self.action_transitions:
-            if transition['from'] == state and transition['action'] == action:
-                possible_states.append(transition['to'])
-                probabilities.append(transition['weight'])
-        probabilities = np.array(probabilities)
-        probabilities = probabilities / np.sum(probabilities)
-        return possible_states, probabilities
+        choice = self.compiled.choice(self.state_ids[state], self.action_ids[action])
+        if choice is None:
+            return [], np.array([])
+        possible_states = [self.states[j] for j in self.compiled.successors(choice)]
+        return possible_states, self.compiled.row_probabilities(choice)
 
     def simulation_step(self, action):
         self.trace(f'>>> Action performed: {action}')
-        possible_states, probabilities = self.allowed_transitions(self.actual_state, action)
-        self.print_allowed_transitions(possible_states, probabilities)
-        next_state = np.random.choice(possible_states, p=probabilities)
+        if self.simulation_trace:
+            self.print_allowed_transitions(*self.allowed_transitions(self.actual_state, action))
+        choice = self.compiled.choice(self.state_ids[self.actual_state], self.action_ids[action])
+        next_state = self.states[self.compiled.sample(choice, self.rng)]
         self.trace(f'>>> Transition chosen: {self.actual_state} -> {next_state}\n')
         self.actual_state = next_state
-        self.path.append(self.actual_state)
+        self.recorder.append(self.state_ids[next_state], self.action_ids[action])
         self.last_action = action
         self.last_next_state = next_state
         next_actions = self.possible_actions(self.actual_state)
         return self.actual_state, next_actions
 
     def possible_actions(self, state):
-        possible_actions = set()
-        for transition in self.action_transitions:
-            if transition['from'] == state:
-                possible_actions.add(transition['action'])
-        return possible_actions
+        choices = self.compiled.choices(self.state_ids[state])
+        return {self.actions[self.choice_actions[choice]] for choice in choices}
     
     def q_learning(self, gamma=0.5, simulations_number=10000):
-        index = lambda s, a: self.states.index(s) * len(self.actions) + self.actions.index(a)
+        index = lambda s, a: self.state_ids[s] * len(self.actions) + self.action_ids[a]
         Q = np.zeros(len(self.states) * len(self.actions))
 
         self.simulation_trace = False
+        record_path = self.recorder.enabled
+        self.recorder.enabled = False
         for i in range(simulations_number):
             alpha = 1/(i + 1)
 
@@ -412,20 +821,18 @@ class MarkovDecisionProcess(MarkovChain):
             state = self.actual_state
             possible_actions = self.possible_actions(state)
 
-            action = np.random.choice(list(possible_actions))
+            action = sorted(possible_actions)[self.rng.integers(len(possible_actions))]
             next_state, next_possible_actions = self.simulation_step(action)
 
-            Qtemp = deepcopy(Q)
             maxQ = 0
             for _action in next_possible_actions:
                 if Q[index(next_state, _action)] > maxQ:
                     maxQ = Q[index(next_state, _action)]
 
             delta = self.state_rewards[state] + gamma * maxQ - Q[index(state, action)]
-            Qtemp[index(state, action)] = Q[index(state, action)] + alpha*delta
-
-            Q = deepcopy(Qtemp)
+            Q[index(state, action)] += alpha*delta
         
         self.simulation_trace = True
+        self.recorder.enabled = record_path
 
         return Q
@@ -0,0 +1,18 @@
+import multiprocessing
+import threading
+
+
+def process_pool(workers, initializer, initargs):
+    # The workers receive the shared data once, through initializer(*initargs),
+    # never through a module global of the parent, which several threads of the
+    # server may be setting at once. fork hands the data over without copying
+    # it, but forking a process that runs other threads can copy held locks
+    # into the child: a threaded parent starts its workers from a fork server
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        context = multiprocessing.get_context('fork')
+    elif 'forkserver' in methods:
+        context = multiprocessing.get_context('forkserver')
+    else:
+        context = multiprocessing.get_context('spawn')
+    return context.Pool(workers, initializer=initializer, initargs=initargs)
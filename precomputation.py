@@ -0,0 +1,195 @@
+import numpy as np
+from scipy import sparse
+
+# Graph analysis of reachability, before any numeric solve: the states whose
+# probability to reach the targets is exactly 0 or 1. For an MDP the rows of
+# the compiled model are the choices, and minimum=True asks about the
+# minimizing scheduler (Pmin) instead of the maximizing one (Pmax).
+
+# up to this many rows, searching in Python is faster than importing scipy.sparse.csgraph
+SMALL_GRAPH = 10000
+
+
+def row_states(compiled):
+    rows = len(compiled.indptr) - 1
+    return np.arange(rows) if compiled.choice_offsets is None else compiled.choice_states()
+
+
+def predecessors(compiled):
+    # state -> rows that reach it with a positive probability
+    matrix = compiled.transition_matrix.copy()
+    matrix.eliminate_zeros()
+    return matrix.T.tocsr()
+
+
+def target_mask(compiled, targets):
+    mask = np.zeros(len(compiled.states), dtype=bool)
+    mask[np.asarray(targets, dtype=np.int64)] = True
+    return mask
+
+
+def successors_of(reverse, nodes):
+    # concatenated rows of the CSR matrix reverse for the given nodes
+    starts, ends = reverse.indptr[nodes], reverse.indptr[nodes + 1]
+    counts = ends - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return reverse.indices[offsets + np.arange(len(offsets))]
+
+
+def reach_some(reverse, owner, start, allowed, rows=None):
+    # states of allowed that reach start by some path, start included;
+    # rows masks the rows (choices) that may be used
+    if len(owner) <= SMALL_GRAPH:
+        return reach_some_small(reverse, owner, start, allowed, rows)
+    # one breadth-first search on the state graph, from an extra node linked to start
+    from scipy.sparse.csgraph import breadth_first_order
+    n = len(start)
+    heads = np.repeat(np.arange(n), np.diff(reverse.indptr))
+    used = reverse.indices
+    if rows is not None:
+        heads, used = heads[rows[used]], used[rows[used]]
+    tails = owner[used]
+    heads, tails = heads[allowed[tails]], tails[allowed[tails]]
+    sources = np.flatnonzero(start)
+    graph = sparse.csr_matrix(
+        (np.ones(len(heads) + len(sources), dtype=np.int8),
+         (np.concatenate((heads, np.full(len(sources), n))), np.concatenate((tails, sources)))),
+        shape=(n + 1, n + 1))
+    order = breadth_first_order(graph, n, directed=True, return_predecessors=False)
+    reached = start.copy()
+    reached[order[order < n]] = True
+    return reached
+
+
+def reach_some_small(reverse, owner, start, allowed, rows=None):
+    # the same search with a work list, without importing scipy.sparse.csgraph
+    indptr, indices, owner = reverse.indptr.tolist(), reverse.indices.tolist(), owner.tolist()
+    usable = None if rows is None else rows.tolist()
+    pending = (allowed & ~start).tolist()
+    queue = np.flatnonzero(start).tolist()
+    for state in queue:
+        for row in indices[indptr[state]:indptr[state + 1]]:
+            if usable is None or usable[row]:
+                source = owner[row]
+                if pending[source]:
+                    pending[source] = False
+                    queue.append(source)
+    reached = start.copy()
+    reached[queue] = True
+    return reached
+
+
+def reach_all(reverse, owner, start, allowed):
+    # states of allowed whose every row reaches start by some path, start included.
+    # Backward search with one counter of unvisited rows per state: every edge
+    # is looked at once, whatever the depth of the graph
+    remaining = np.bincount(owner, minlength=len(start)).tolist()
+    indptr, indices, owner = reverse.indptr.tolist(), reverse.indices.tolist(), owner.tolist()
+    allowed = (allowed & ~start).tolist()
+    hit = bytearray(len(owner))
+    queue = np.flatnonzero(start).tolist()
+    for state in queue:
+        for row in indices[indptr[state]:indptr[state + 1]]:
+            if not hit[row]:
+                hit[row] = 1
+                source = owner[row]
+                remaining[source] -= 1
+                if remaining[source] == 0 and allowed[source]:
+                    allowed[source] = False
+                    queue.append(source)
+    reached = start.copy()
+    reached[queue] = True
+    return reached
+
+
+def attractor_choices(compiled, start, rows, reverse=None):
+    # for every state that reaches start through the masked rows, one of these
+    # rows leading to a state closer to start (-1 for the others and for start).
+    # Breadth-first search from an extra node over states and rows: the
+    # predecessor of a state is the row it was reached from
+    from scipy.sparse.csgraph import breadth_first_order
+    if reverse is None:
+        reverse = predecessors(compiled)
+    owner = row_states(compiled)
+    n, m = len(start), len(owner)
+    heads = np.repeat(np.arange(n), np.diff(reverse.indptr))
+    used = reverse.indices
+    heads, used = heads[rows[used]], used[rows[used]]
+    sources = np.flatnonzero(start)
+    leaving = np.flatnonzero(rows & ~start[owner])
+    graph = sparse.csr_matrix(
+        (np.ones(len(heads) + len(leaving) + len(sources), dtype=np.int8),
+         (np.concatenate((heads, n + leaving, np.full(len(sources), n + m))),
+          np.concatenate((n + used, owner[leaving], sources)))),
+        shape=(n + m + 1, n + m + 1))
+    _, parents = breadth_first_order(graph, n + m, directed=True, return_predecessors=True)
+    choices = parents[:n] - n
+    choices[(parents[:n] < n) | start] = -1
+    return choices
+
+
+def prob0(compiled, targets, minimum=False, reverse=None):
+    # Pmax = 0: no path to the targets. Pmin = 0: some scheduler avoids them,
+    # i.e. not every choice is forced towards the targets. reverse is
+    # predecessors(compiled), computed when not given
+    if reverse is None:
+        reverse = predecessors(compiled)
+    owner = row_states(compiled)
+    start = target_mask(compiled, targets)
+    everywhere = np.ones(len(start), dtype=bool)
+    if minimum and compiled.choice_offsets is not None:
+        return ~reach_all(reverse, owner, start, everywhere)
+    return ~reach_some(reverse, owner, start, everywhere)
+
+
+def prob1(compiled, targets, minimum=False, zero=None, reverse=None):
+    # zero is prob0 with the same minimum, computed when not given
+    if reverse is None:
+        reverse = predecessors(compiled)
+    owner = row_states(compiled)
+    start = target_mask(compiled, targets)
+    if zero is None:
+        zero = prob0(compiled, targets, minimum, reverse)
+    if compiled.choice_offsets is None or minimum:
+        # Pmin = 1: no choice leads to a state of Pmin = 0 without visiting a target first
+        return ~reach_some(reverse, owner, zero, ~start)
+    return prob1_max(compiled, reverse, owner, start)
+
+
+def prob1_max(compiled, reverse, owner, start):
+    # greatest fixpoint over U: the states that reach the targets with a choice
+    # whose successors all stay in U
+    entry_rows = np.repeat(np.arange(len(owner)), np.diff(compiled.indptr))
+    positive = compiled.probabilities > 0
+    candidates = np.ones(len(start), dtype=bool)
+    while True:
+        leaving = np.bincount(entry_rows[positive & ~candidates[compiled.indices]], minlength=len(owner)) > 0
+        reached = reach_some(reverse, owner, start, candidates, ~leaving)
+        if np.array_equal(reached, candidates):
+            return reached
+        candidates = reached
+
+
+def end_components(compiled, states):
+    # maximal end components inside the states mask: label of the component of
+    # every state (-1 outside any), and the rows that stay in their component.
+    # Strongly connected components are refined until no row leaves its own
+    from scipy.sparse.csgraph import connected_components
+    owner = row_states(compiled)
+    entry_rows = np.repeat(np.arange(len(owner)), np.diff(compiled.indptr))
+    positive = compiled.probabilities > 0
+    inside = states.copy()
+    rows = inside[owner]
+    while True:
+        edges = positive & rows[entry_rows]
+        graph = sparse.csr_matrix(
+            (np.ones(int(edges.sum()), dtype=np.int8), (owner[entry_rows[edges]], compiled.indices[edges])),
+            shape=(len(states), len(states)))
+        _, labels = connected_components(graph, directed=True, connection='strong')
+        labels[~inside] = -1
+        leaving = positive & (labels[compiled.indices] != labels[owner[entry_rows]])
+        stay = rows & (np.bincount(entry_rows[leaving], minlength=len(owner)) == 0)
+        kept = inside & (np.bincount(owner[stay], minlength=len(states)) > 0)
+        if np.array_equal(stay, rows) and np.array_equal(kept, inside):
+            return labels, rows
+        rows, inside = stay & kept[owner], kept
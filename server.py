@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+import batch
+from models import MarkovDecisionProcess
+from solvers import DIRECT_LIMIT, solve
+
+# options of the batch commands, overridden by the fields of a request
+DEFAULTS = {'technique': 'linear', 'initial': None, 'epsilon': 0.01, 'delta': 0.01, 'theta': 0.5, 'steps': 20,
+            'paths': 10000, 'seed': None, 'workers': None, 'solver': 'auto', 'iteration': 'jacobi', 'omega': 1.0, 'relative': False,
+            'tolerance': 1e-4, 'max_iterations': 10000, 'minimum': False, 'runs': 1, 'gamma': 0.5, 'episodes': 10000}
+MAX_FACTORIZATIONS = 16
+
+
+class RegisteredModel:
+    def __init__(self, path, model, load_seconds):
+        self.path = path
+        self.model = model
+        self.load_seconds = load_seconds
+        # simulations and solvers change the state and the generator of the model
+        self.lock = threading.Lock()
+        # property -> (LU factorization of I - A, b, keep, values), least recently used first
+        self.factorizations = {}
+        self.queries = 0
+
+    def describe(self):
+        # the factorizations change under the lock, in the worker threads
+        with self.lock:
+            return {'model': self.path, 'type': 'MDP' if isinstance(self.model, MarkovDecisionProcess) else 'MC',
+                    'states': len(self.model.states), 'load_seconds': self.load_seconds, 'queries': self.queries,
+                    'factorizations': list(self.factorizations)}
+
+    def reachability(self, property, initial=None, solver='auto'):
+        from scipy.sparse.linalg import splu
+        model = self.model
+        entry = self.factorizations.pop(property, None)
+        if entry is None:
+            matrix, b, keep, values = model.linear_system(property)
+            if solver != 'direct' and keep.sum() > DIRECT_LIMIT:
+                # too large to factor: Krylov solve, nothing kept for the next queries
+                values[keep] = solve(matrix, b, solver)
+                return self.answer(values, initial)
+            entry = (splu(matrix) if keep.any() else None, b, keep, values)
+        self.factorizations[property] = entry
+        if len(self.factorizations) > MAX_FACTORIZATIONS:
+            del self.factorizations[next(iter(self.factorizations))]
+
+        factor, b, keep, values = entry
+        probabilities = values.copy()
+        if factor is not None:
+            probabilities[keep] = factor.solve(b)
+        return self.answer(probabilities, initial)
+
+    def answer(self, probabilities, initial):
+        if initial is None:
+            return dict(zip(self.model.states, probabilities.tolist()))
+        return probabilities[self.model.state_ids[initial]]
+
+    def run(self, command, request):
+        options = SimpleNamespace(**{**DEFAULTS, **request})
+        with self.lock:
+            self.queries += 1
+            if options.seed is not None:
+                self.model.rng = np.random.default_rng(options.seed)
+            if command == 'check':
+                if options.technique == 'linear' and options.solver in ('auto', 'direct') \
+                        and not isinstance(self.model, MarkovDecisionProcess):
+                    return self.reachability(request['property'], options.initial, options.solver)
+                return batch.check(self.model, options, request['property'])
+            if command == 'reward':
+                return batch.reward(self.model, f"{request['initial']}:{request['target']}")
+            if command == 'simulate':
+                return batch.simulate(self.model, options)[0]['result']
+            return batch.learn(self.model, options)[0]['result']
+
+
+class ModelRegistry:
+    def __init__(self, executor, no_cache=False):
+        self.executor = executor
+        self.no_cache = no_cache
+        # path -> future of its RegisteredModel, so a model is loaded once however many queries wait for it
+        self.models = {}
+
+    def load(self, path):
+        start = time.perf_counter()
+        model = batch.load(path, self.no_cache)
+        model.simulation_trace = False
+        return RegisteredModel(path, model, time.perf_counter() - start)
+
+    async def get(self, path):
+        path = os.path.realpath(path)
+        future = self.models.get(path)
+        if future is None:
+            future = self.models[path] = asyncio.get_running_loop().run_in_executor(self.executor, self.load, path)
+        try:
+            return await future
+        except Exception:
+            if self.models.get(path) is future:
+                del self.models[path]
+            raise
+
+    def unload(self, path):
+        return self.models.pop(os.path.realpath(path), None) is not None
+
+    def loaded(self):
+        return [future.result().describe() for future in self.models.values()
+                if future.done() and future.exception() is None]
+
+
+class ModelServer:
+    def __init__(self, workers=None, no_cache=False):
+        self.executor = ThreadPoolExecutor(workers)
+        self.registry = ModelRegistry(self.executor, no_cache)
+
+    async def handle(self, request):
+        start = time.perf_counter()
+        try:
+            if not isinstance(request, dict):
+                raise Exception('Error: a request is a JSON object')
+            command = request.get('command')
+            if command == 'ping':
+                result = 'pong'
+            elif command == 'models':
+                result = self.registry.loaded()
+            elif command == 'unload':
+                result = self.registry.unload(request['model'])
+            elif command == 'load':
+                result = (await self.registry.get(request['model'])).describe()
+            elif command in batch.COMMANDS:
+                entry = await self.registry.get(request['model'])
+                # solves and simulations run in the worker pool, the event loop only routes requests
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, entry.run, command, request)
+            else:
+                raise Exception(f'Error: unknown command {command}')
+            response = {'ok': True, 'result': result}
+        except KeyError as e:
+            response = {'ok': False, 'error': f'Error: unknown state, action or field: {e.args[0]}'}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        response['seconds'] = time.perf_counter() - start
+        if isinstance(request, dict) and 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    async def serve_lines(self, reader, writer):
+        # one JSON request per line, answered by one JSON line
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    response = await self.handle(json.loads(line))
+                except json.JSONDecodeError as e:
+                    response = {'ok': False, 'error': f'Error: invalid JSON: {e}'}
+                writer.write(json.dumps(response, default=batch.encode).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve_http(self, reader, writer):
+        # POST / with a JSON request, GET /models
+        try:
+            method, target, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+            headers = {}
+            while (line := await reader.readline()).strip():
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            status = 200
+            if method == 'GET' and target == '/models':
+                response = await self.handle({'command': 'models'})
+            elif method == 'POST' and target == '/':
+                try:
+                    response = await self.handle(json.loads(body))
+                except json.JSONDecodeError as e:
+                    status, response = 400, {'ok': False, 'error': f'Error: invalid JSON: {e}'}
+            else:
+                status, response = 404, {'ok': False, 'error': f'Error: no resource {method} {target}'}
+            content = json.dumps(response, default=batch.encode).encode()
+            reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found'}[status]
+            writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+                         f'Content-Length: {len(content)}\r\nConnection: close\r\n\r\n'.encode() + content)
+            await writer.drain()
+        except (ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path=None, host='127.0.0.1', port=None, preload=()):
+        servers = []
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            servers.append(await asyncio.start_unix_server(self.serve_lines, socket_path))
+        if port is not None:
+            servers.append(await asyncio.start_server(self.serve_http, host, port))
+        for path in preload:
+            await self.registry.get(path)
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if socket_path is not None and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+class Client:
+    # blocking client for the Unix socket (socket_path) or the HTTP server (port)
+    def __init__(self, socket_path=None, host='127.0.0.1', port=None, timeout=None):
+        if socket_path is None and port is None:
+            raise Exception('Error: the client needs a socket path or a port')
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connection = None
+
+    def send(self, request):
+        if self.socket_path is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request('POST', '/', json.dumps(request), {'Content-Type': 'application/json'})
+                return json.loads(connection.getresponse().read())
+            finally:
+                connection.close()
+        if self.connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            connection.connect(self.socket_path)
+            self.connection = connection.makefile('rwb')
+            connection.close()
+        self.connection.write(json.dumps(request).encode() + b'\n')
+        self.connection.flush()
+        line = self.connection.readline()
+        if not line:
+            raise Exception('Error: the server closed the connection')
+        return json.loads(line)
+
+    def request(self, command, **fields):
+        response = self.send({'command': command, **fields})
+        if not response['ok']:
+            raise Exception(response['error'])
+        return response['result']
+
+    def load(self, model):
+        return self.request('load', model=model)
+
+    def check(self, model, property, **options):
+        return self.request('check', model=model, property=property, **options)
+
+    def reward(self, model, initial, target):
+        return self.request('reward', model=model, initial=initial, target=target)
+
+    def simulate(self, model, steps=10, runs=1, seed=None):
+        return self.request('simulate', model=model, steps=steps, runs=runs, seed=seed)
+
+    def learn(self, model, gamma=0.5, episodes=10000, seed=None):
+        return self.request('learn', model=model, gamma=gamma, episodes=episodes, seed=seed)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keep models loaded and answer JSON queries.')
+    parser.add_argument('models', nargs='*', help='models loaded at startup')
+    parser.add_argument('--socket', help='Unix socket path (one JSON request per line)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='HTTP port (POST / with a JSON request)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args(argv)
+    if args.socket is None and args.port is None:
+        parser.error('give --socket, --port or both')
+    server = ModelServer(args.workers, args.no_cache)
+    try:
+        asyncio.run(server.serve(args.socket, args.host, args.port, args.models))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import numpy as np
+from pools import process_pool
+
+
+class BatchSimulator:
+    def __init__(self, compiled, rng, batch_size=10000):
+        self.compiled = compiled
+        self.rng = rng
+        self.batch_size = batch_size
+        # states whose only successor is themselves can never reach anything else
+        degrees = np.diff(compiled.indptr)
+        self.absorbing = np.zeros(len(compiled.states), dtype=bool)
+        single = np.flatnonzero(degrees == 1)
+        self.absorbing[single] = compiled.indices[compiled.indptr[single]] == single
+
+    def step(self, current):
+        return self.compiled.sample_rows(current, self.rng)
+
+    def reachability(self, initial, targets, number_paths, max_steps):
+        target_mask = np.zeros(len(self.compiled.states), dtype=bool)
+        target_mask[targets] = True
+
+        current = np.full(number_paths, initial, dtype=np.int32)
+        hit = target_mask[current]
+        done = hit | self.absorbing[current]
+        for _ in range(1, max_steps):
+            active = np.flatnonzero(~done)
+            if len(active) == 0:
+                break
+            current[active] = self.step(current[active])
+            reached = target_mask[current[active]]
+            hit[active[reached]] = True
+            done[active] = reached | self.absorbing[current[active]]
+        return hit
+
+    def reachability_batches(self, initial, targets, number_paths, max_steps):
+        while number_paths > 0:
+            size = min(self.batch_size, number_paths)
+            yield self.reachability(initial, targets, size, max_steps)
+            number_paths -= size
+
+    def count_hits(self, initial, targets, number_paths, max_steps):
+        return sum(int(np.count_nonzero(hit)) for hit in self.reachability_batches(initial, targets, number_paths, max_steps))
+
+
+# model of the worker processes, set once per worker by process_pool
+_worker_compiled = None
+
+
+def _init_worker(compiled):
+    global _worker_compiled
+    _worker_compiled = compiled
+
+
+def _count_chunk(task):
+    seed, initial, targets, number_paths, max_steps = task
+    simulator = BatchSimulator(_worker_compiled, np.random.default_rng(seed))
+    return simulator.count_hits(initial, targets, number_paths, max_steps)
+
+
+def parallel_count_hits(compiled, initial, targets, number_paths, max_steps, seed=None, workers=None, chunk_size=10000):
+    # the chunks and their streams depend only on the root seed, so the total
+    # count is the same whatever the number of workers
+    sizes = [chunk_size] * (number_paths // chunk_size)
+    if number_paths % chunk_size:
+        sizes.append(number_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers == 1 or len(sizes) <= 1:
+        return sum(BatchSimulator(compiled, np.random.default_rng(s)).count_hits(initial, targets, size, max_steps)
+                   for s, size in zip(seeds, sizes))
+
+    tasks = [(s, initial, targets, size, max_steps) for s, size in zip(seeds, sizes)]
+    with process_pool(workers, _init_worker, (compiled,)) as pool:
+        return sum(pool.map(_count_chunk, tasks))
+
+
+def distance_to_targets(compiled, targets):
+    # breadth-first search on the reversed graph, -1 for states that cannot reach a target
+    reverse = compiled.transition_matrix.T.tocsr()
+    distance = np.full(len(compiled.states), -1, dtype=np.int64)
+    frontier = np.unique(np.asarray(targets, dtype=np.int64))
+    distance[frontier] = 0
+    d = 0
+    while len(frontier) > 0:
+        d += 1
+        predecessors = reverse[frontier].indices
+        frontier = np.unique(predecessors[distance[predecessors] < 0])
+        distance[frontier] = d
+    return distance
+
+
+def biased_weights(compiled, targets, bias=0.5):
+    # in every state that has both, the edges getting closer to the targets
+    # receive a total probability of at least bias, and the others the rest
+    distance = distance_to_targets(compiled, targets)
+    entry_rows = np.repeat(np.arange(len(compiled.indptr) - 1), np.diff(compiled.indptr))
+    successor_distance = distance[compiled.indices]
+    closer = (successor_distance >= 0) & ((distance[entry_rows] < 0) | (successor_distance < distance[entry_rows]))
+
+    rows = len(compiled.indptr) - 1
+    closer_total = np.bincount(entry_rows, weights=compiled.probabilities * closer, minlength=rows)
+    other_total = np.bincount(entry_rows, weights=compiled.probabilities * ~closer, minlength=rows)
+    mixed = (closer_total > 0) & (other_total > 0)
+
+    weights = compiled.probabilities.copy()
+    boost = closer & mixed[entry_rows]
+    damp = ~closer & mixed[entry_rows]
+    # never pushes paths away from the targets where they already go there more often
+    boosted = np.maximum(bias, closer_total)
+    weights[boost] *= boosted[entry_rows[boost]] / closer_total[entry_rows[boost]]
+    weights[damp] *= (1 - boosted[entry_rows[damp]]) / other_total[entry_rows[damp]]
+    return weights
+
+
+class ImportanceSampler:
+    def __init__(self, compiled, biased, rng, batch_size=10000):
+        self.compiled = compiled
+        self.biased = biased
+        self.rng = rng
+        self.batch_size = batch_size
+        # likelihood ratio p / q of every edge, in log space
+        self.log_ratio = np.log(compiled.probabilities) - np.log(biased.probabilities)
+
+    def path_weights(self, initial, targets, number_paths, max_steps):
+        target_mask = np.zeros(len(self.compiled.states), dtype=bool)
+        target_mask[targets] = True
+        can_reach = distance_to_targets(self.compiled, targets) >= 0
+
+        current = np.full(number_paths, initial, dtype=np.int32)
+        log_weight = np.zeros(number_paths)
+        hit = target_mask[current]
+        done = hit | ~can_reach[current]
+        for _ in range(1, max_steps):
+            active = np.flatnonzero(~done)
+            if len(active) == 0:
+                break
+            entries = self.biased.sample_entries(current[active], self.rng)
+            current[active] = self.biased.indices[entries]
+            log_weight[active] += self.log_ratio[entries]
+            reached = target_mask[current[active]]
+            hit[active[reached]] = True
+            done[active] = reached | ~can_reach[current[active]]
+        return np.where(hit, np.exp(log_weight), 0.0)
+
+    def estimate(self, initial, targets, number_paths, max_steps):
+        total = 0.0
+        total_squares = 0.0
+        remaining = number_paths
+        while remaining > 0:
+            size = min(self.batch_size, remaining)
+            weights = self.path_weights(initial, targets, size, max_steps)
+            total += weights.sum()
+            total_squares += np.square(weights).sum()
+            remaining -= size
+        mean = total / number_paths
+        variance = max(total_squares / number_paths - mean ** 2, 0.0) * number_paths / max(number_paths - 1, 1)
+        return mean, variance / number_paths
+
+
+class TraceRecorder:
+    def __init__(self, states, actions=None, capacity=1024, enabled=True, filename=None):
+        # one int32 row per step: the state id, plus the action id when actions are given
+        self.states = states
+        self.actions = actions
+        self.enabled = enabled
+        self.filename = filename
+        self.columns = 1 if actions is None else 2
+        self.buffer = np.empty((capacity, self.columns), dtype=np.int32)
+        self.length = 0    # steps held in the buffer
+        self.flushed = 0   # steps of the current trace already written to filename
+        self.offsets = []  # first step of every trace in filename, the current one last
+
+    def reset(self, state_id):
+        # the traces follow each other in filename, which is emptied by the first one only
+        if self.filename is not None:
+            if self.offsets:
+                self.flush()
+                self.offsets.append(self.offsets[-1] + self.flushed)
+            else:
+                open(self.filename, 'wb').close()
+                self.offsets.append(0)
+        self.length = 0
+        self.flushed = 0
+        self.append(state_id)
+
+    def append(self, state_id, action_id=-1):
+        if not self.enabled:
+            return
+        if self.length == len(self.buffer):
+            if self.filename is not None:
+                self.flush()
+            else:
+                grown = np.empty((2 * len(self.buffer), self.columns), dtype=np.int32)
+                grown[:self.length] = self.buffer
+                self.buffer = grown
+        self.buffer[self.length, 0] = state_id
+        if self.columns == 2:
+            self.buffer[self.length, 1] = action_id
+        self.length += 1
+
+    def flush(self):
+        with open(self.filename, 'ab') as f:
+            self.buffer[:self.length].tofile(f)
+        self.flushed += self.length
+        self.length = 0
+
+    def written(self):
+        # steps of the current trace already in filename
+        start = self.offsets[-1]
+        return load_trace(self.filename, self.columns)[start:start + self.flushed]
+
+    def records(self):
+        if self.filename is None or self.flushed == 0:
+            return self.buffer[:self.length]
+        return np.concatenate((self.written(), self.buffer[:self.length]))
+
+    def trace_records(self, k):
+        # records of the k-th trace written to filename, the current one being the last
+        if k in (-1, len(self.offsets) - 1):
+            return self.records()
+        return np.array(load_trace(self.filename, self.columns)[self.offsets[k]:self.offsets[k + 1]])
+
+    def state_ids(self):
+        return self.records()[:, 0]
+
+    def action_ids(self):
+        return self.records()[:, 1]
+
+    def save(self, filename):
+        np.save(filename, self.records() if self.columns == 2 else self.state_ids())
+
+    def __len__(self):
+        return self.flushed + self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.states[s] for s in self.state_ids()[i]]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('trace index out of range')
+        if i >= self.flushed:
+            return self.states[self.buffer[i - self.flushed, 0]]
+        return self.states[self.written()[i, 0]]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __repr__(self):
+        return repr(self[:])
+
+
+def load_trace(filename, columns=1):
+    return np.memmap(filename, dtype=np.int32, mode='r').reshape(-1, columns)
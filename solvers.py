@@ -0,0 +1,264 @@
+import numpy as np
+from scipy import sparse
+
+# Solvers of the sparse systems (I - A) x = b of reachability. SuperLU is
+# exact and fast while its fill-in stays small; past DIRECT_LIMIT unknowns
+# the Krylov methods, preconditioned by an incomplete LU, take over.
+METHODS = ('auto', 'direct', 'gmres', 'bicgstab')
+DIRECT_LIMIT = 20000
+TOLERANCE = 1e-10
+
+
+def ilu_preconditioner(matrix):
+    from scipy.sparse.linalg import LinearOperator, spilu
+    # a small fill keeps the factorization cheap on well connected graphs
+    ilu = spilu(matrix.tocsc(), drop_tol=1e-3, fill_factor=2)
+    return LinearOperator(matrix.shape, ilu.solve)
+
+
+def solve_krylov(matrix, b, method):
+    from scipy.sparse.linalg import bicgstab, gmres
+    try:
+        preconditioner = ilu_preconditioner(matrix)
+    except RuntimeError:
+        # singular incomplete factors: unpreconditioned iterations
+        preconditioner = None
+    if method == 'gmres':
+        x, info = gmres(matrix, b, rtol=TOLERANCE, atol=0.0, restart=50, maxiter=1000, M=preconditioner)
+    else:
+        x, info = bicgstab(matrix, b, rtol=TOLERANCE, atol=0.0, maxiter=10000, M=preconditioner)
+    return x, info == 0
+
+
+def solve(matrix, b, method='auto'):
+    if method not in METHODS:
+        raise Exception(f'Error: unknown solver {method}, expected one of {", ".join(METHODS)}')
+    if matrix.shape[0] == 0:
+        return np.zeros(0)
+    if method == 'direct' or (method == 'auto' and matrix.shape[0] <= DIRECT_LIMIT):
+        from scipy.sparse.linalg import spsolve
+        return np.atleast_1d(spsolve(sparse.csc_matrix(matrix), b))
+
+    x, converged = solve_krylov(matrix, b, 'bicgstab' if method == 'auto' else method)
+    if not converged and method == 'auto':
+        x, converged = solve_krylov(matrix, b, 'gmres')
+    if not converged:
+        if method != 'auto':
+            raise Exception(f'Error: {method} did not converge')
+        from scipy.sparse.linalg import spsolve
+        x = spsolve(sparse.csc_matrix(matrix), b)
+    return np.atleast_1d(x)
+
+
+# Stationary iterations on the same systems, written as sparse products over
+# all the unknowns at once: Jacobi, and Gauss-Seidel / successive
+# over-relaxation with one sparse triangular substitution per sweep
+ITERATIONS = ('jacobi', 'gauss-seidel', 'sor')
+
+
+def has_converged(x, previous, epsilon, relative):
+    difference = np.abs(x - previous)
+    if relative:
+        # entries still at zero fall back to the absolute difference
+        scale = np.abs(x)
+        difference = np.where(scale > 0, difference / np.where(scale > 0, scale, 1.0), difference)
+    largest = float(difference.max()) if len(difference) > 0 else 0.0
+    return largest < epsilon, largest
+
+
+def solve_iterative(matrix, b, method='jacobi', omega=1.0, epsilon=1e-4, relative=False, max_iterations=10000, x0=None):
+    if method not in ITERATIONS:
+        raise Exception(f'Error: unknown iteration {method}, expected one of {", ".join(ITERATIONS)}')
+    if method == 'gauss-seidel':
+        omega = 1.0
+    elif method == 'sor' and not 0 < omega < 2:
+        raise Exception('Error: the relaxation factor must be in ]0, 2[')
+    matrix = sparse.csr_matrix(matrix)
+    diagonal = matrix.diagonal()
+    x = np.zeros(len(b)) if x0 is None else np.array(x0, dtype=np.float64)
+
+    if method == 'jacobi':
+        off_diagonal = matrix - sparse.diags(diagonal, format='csr')
+        step = lambda x: (b - off_diagonal @ x) / diagonal
+    else:
+        from scipy.sparse.linalg import splu
+        # (D + omega L) x' = omega b - (omega U + (omega - 1) D) x; the triangle is
+        # factored once in its natural order, which adds no fill-in, so that
+        # every sweep is a single forward substitution
+        lower = (sparse.diags(diagonal) + omega * sparse.tril(matrix, k=-1)).tocsc()
+        upper = (omega * sparse.triu(matrix, k=1) + (omega - 1) * sparse.diags(diagonal)).tocsr()
+        substitution = splu(lower, permc_spec='NATURAL', diag_pivot_thresh=0, options={'SymmetricMode': True})
+        step = lambda x: substitution.solve(omega * b - upper @ x)
+
+    iterations = 0
+    done, difference = len(b) == 0, 0.0
+    while not done and iterations < max_iterations:
+        previous = x
+        # a diverging iteration overflows to inf, which ends it
+        with np.errstate(over='ignore', invalid='ignore'):
+            x = step(x)
+            done, difference = has_converged(x, previous, epsilon, relative)
+        iterations += 1
+        if not np.isfinite(difference):
+            raise Exception(f'Error: {method} diverged after {iterations} iterations'
+                            + (f', try a smaller relaxation factor than {omega}' if method == 'sor' else ''))
+    residual = float(np.abs(b - matrix @ x).max()) if len(b) > 0 else 0.0
+    return x, {'method': method, 'iterations': iterations, 'difference': difference, 'residual': residual, 'converged': done}
+
+
+def solve_jacobi(matrix, one, maybe, epsilon=1e-4, relative=False, max_iterations=10000):
+    # Jacobi on the whole transition matrix, masked to the undecided states:
+    # x_i = (sum over j != i of P[i, j] x_j) / (1 - P[i, i]), without copying
+    # the reduced system, so a memory-mapped matrix stays on disk
+    diagonal = matrix.diagonal()
+    # 1 - P[i, i] > 0 for an undecided state: a state looping on itself surely is decided
+    scale = np.where(maybe, 1 - diagonal, 1.0)
+    x = one.astype(np.float64)
+    iterations = 0
+    done, difference = not maybe.any(), 0.0
+    while not done and iterations < max_iterations:
+        previous = x
+        x = np.where(maybe, (matrix @ x - diagonal * x) / scale, x)
+        iterations += 1
+        done, difference = has_converged(x[maybe], previous[maybe], epsilon, relative)
+    residual = float(np.abs(x - matrix @ x)[maybe].max()) if maybe.any() else 0.0
+    return x, {'method': 'jacobi', 'iterations': iterations, 'difference': difference, 'residual': residual,
+               'converged': done}
+
+
+def graph_analysis(compiled, targets, minimum=False, reverse=None):
+    from precomputation import predecessors, prob0, prob1
+    if reverse is None:
+        reverse = predecessors(compiled)
+    zero = prob0(compiled, targets, minimum, reverse)
+    one = prob1(compiled, targets, minimum, zero, reverse)
+    return zero, one, ~(zero | one)
+
+
+def interval_iteration(compiled, targets, minimum=False, epsilon=1e-6, relative=False, max_iterations=100000):
+    # Lower and upper bounds of the reachability probabilities (Pmax, or Pmin
+    # with minimum=True for an MDP), iterated together until their gap is
+    # below epsilon in every state. Graph analysis first fixes the states of
+    # probability 0 and 1; for Pmax the upper bound is also deflated in the end
+    # components, where it would otherwise stay above the least fixpoint
+    from precomputation import end_components
+    zero, one, maybe = graph_analysis(compiled, targets, minimum)
+    lower = one.astype(np.float64)
+    upper = (~zero).astype(np.float64)
+    matrix = compiled.transition_matrix
+    choices = compiled.choice_offsets
+    reduce = np.minimum.reduceat if minimum else np.maximum.reduceat
+
+    def bellman(x):
+        rows = matrix @ x
+        return rows if choices is None else reduce(rows, choices[:-1])
+
+    components = None
+    if choices is not None and not minimum and maybe.any():
+        labels, stay = end_components(compiled, maybe)
+        if (labels >= 0).any():
+            owner = compiled.choice_states()
+            exits = np.flatnonzero(~stay & (labels[owner] >= 0))
+            components = (labels, owner[exits], exits)
+
+    iterations = 0
+    gap = float((upper - lower)[maybe].max()) if maybe.any() else 0.0
+    while gap >= epsilon and iterations < max_iterations:
+        lower = np.where(maybe, bellman(lower), lower)
+        upper = np.where(maybe, bellman(upper), upper)
+        if components is not None:
+            labels, exit_states, exits = components
+            # no scheduler does better in an end component than its best exit
+            best = np.zeros(labels.max() + 1)
+            np.maximum.at(best, labels[exit_states], (matrix[exits] @ upper))
+            inside = labels >= 0
+            upper[inside] = np.minimum(upper[inside], best[labels[inside]])
+        iterations += 1
+        difference = (upper - lower)[maybe]
+        if relative:
+            difference = np.where(lower[maybe] > 0, difference / np.where(lower[maybe] > 0, lower[maybe], 1.0), np.inf)
+        gap = float(difference.max())
+    return lower, upper, {'iterations': iterations, 'gap': gap, 'converged': gap < epsilon,
+                          'undecided': int(maybe.sum())}
+
+
+# Optimal reachability of an MDP: the probabilities under the best scheduler
+# (Pmax, or Pmin with minimum=True) and that scheduler, one row of the
+# compiled model (a choice) for every state
+def optimal_scheduler(compiled, values, targets, minimum=False, tolerance=1e-9, reverse=None):
+    from precomputation import attractor_choices, row_states, target_mask
+    owner = row_states(compiled)
+    rows = compiled.transition_matrix @ values
+    if minimum:
+        optimal = rows <= values[owner] + tolerance
+    else:
+        # the choices of best value may loop without reaching the targets:
+        # take them only when they get one step closer to the targets
+        optimal = rows >= values[owner] - tolerance
+    start = target_mask(compiled, targets)
+    scheduler = compiled.choice_offsets[:-1].copy()
+    chosen = np.flatnonzero(optimal)[::-1] if minimum else np.zeros(0, dtype=np.int64)
+    scheduler[owner[chosen]] = chosen
+    if not minimum:
+        attracted = attractor_choices(compiled, start, optimal, reverse)
+        scheduler = np.where(attracted >= 0, attracted, scheduler)
+    return scheduler
+
+
+def value_iteration(compiled, targets, minimum=False, epsilon=1e-6, relative=False, max_iterations=100000):
+    from precomputation import predecessors
+    reverse = predecessors(compiled)
+    _, one, maybe = graph_analysis(compiled, targets, minimum, reverse)
+    reduce = np.minimum.reduceat if minimum else np.maximum.reduceat
+    matrix = compiled.transition_matrix
+    x = one.astype(np.float64)
+    iterations = 0
+    done, difference = not maybe.any(), 0.0
+    while not done and iterations < max_iterations:
+        previous = x
+        x = np.where(maybe, reduce(matrix @ x, compiled.choice_offsets[:-1]), x)
+        iterations += 1
+        done, difference = has_converged(x[maybe], previous[maybe], epsilon, relative)
+    scheduler = optimal_scheduler(compiled, x, targets, minimum, epsilon, reverse)
+    return x, scheduler, {'method': 'value', 'iterations': iterations, 'difference': difference, 'converged': done}
+
+
+def policy_iteration(compiled, targets, minimum=False, solver='auto', max_iterations=1000):
+    # every scheduler is evaluated exactly by a sparse solve over the undecided
+    # states, and only changed where another choice is strictly better. For
+    # Pmax the first scheduler heads to the targets from every undecided state,
+    # so that no scheduler met keeps the undecided states in a loop
+    from precomputation import predecessors, row_states
+    reverse = predecessors(compiled)
+    _, one, maybe = graph_analysis(compiled, targets, minimum, reverse)
+    matrix = compiled.transition_matrix
+    owner = row_states(compiled)
+    offsets = compiled.choice_offsets
+    reduce = np.minimum.reduceat if minimum else np.maximum.reduceat
+    x = one.astype(np.float64)
+    if minimum:
+        scheduler = offsets[:-1].copy()
+    else:
+        scheduler = optimal_scheduler(compiled, np.zeros(len(x)), targets, tolerance=np.inf, reverse=reverse)
+    states = np.flatnonzero(maybe)
+
+    iterations = 0
+    done = len(states) == 0
+    while not done and iterations < max_iterations:
+        chosen = matrix[scheduler[states]]
+        b = chosen @ one.astype(np.float64)
+        A = chosen[:, maybe]
+        x[maybe] = solve((sparse.identity(len(states), format='csr') - A).tocsc(), b, solver)
+        iterations += 1
+
+        rows = matrix @ x
+        best = reduce(rows, offsets[:-1])
+        current = rows[scheduler]
+        improved = (best < current - TOLERANCE) if minimum else (best > current + TOLERANCE)
+        improved &= maybe
+        done = not improved.any()
+        if not done:
+            candidates = np.flatnonzero(improved[owner] & (rows == best[owner]))
+            scheduler[owner[candidates[::-1]]] = candidates[::-1]
+    scheduler = np.where(maybe, scheduler, optimal_scheduler(compiled, x, targets, minimum, reverse=reverse))
+    return x, scheduler, {'method': 'policy', 'iterations': iterations, 'converged': done}
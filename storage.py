@@ -0,0 +1,302 @@
+import json
+import os
+import sys
+import tempfile
+import numpy as np
+import loader
+from models import (CompiledModel, MarkovChain, MarkovDecisionProcess, TemporaryModel, TransitionStore,
+                    fill_alias_tables)
+
+# file layout: MAGIC, a JSON header padded to HEADER_SIZE bytes, then every
+# section as a contiguous little-endian array starting on a 64-byte boundary
+MAGIC = b'MPARBIN1'
+HEADER_SIZE = 4096
+COLUMNS = (('source', np.int32), ('target', np.int32), ('action', np.int32), ('weight', np.int64), ('line', np.int32))
+
+
+class SpooledTransitionStore(TransitionStore):
+    # a TransitionStore that keeps at most chunk_size transitions in memory
+    # and spools the rest to temporary files
+    def __init__(self, directory=None, chunk_size=1 << 20):
+        super().__init__(chunk_size)
+        self.chunk_size = chunk_size
+        self.files = {name: tempfile.TemporaryFile(dir=directory) for name, _ in COLUMNS}
+        self.spooled = 0
+
+    def reserve(self, count):
+        if self.length + count > len(self.source) and self.length > 0:
+            self.flush()
+        super().reserve(count)
+
+    def flush(self):
+        for name, _ in COLUMNS:
+            self.files[name].seek(0, os.SEEK_END)
+            getattr(self, name)[:self.length].tofile(self.files[name])
+        self.spooled += self.length
+        self.length = 0
+
+    def chunks(self):
+        for start in range(0, self.spooled, self.chunk_size):
+            count = min(self.chunk_size, self.spooled - start)
+            columns = []
+            for name, dtype in COLUMNS:
+                f = self.files[name]
+                f.seek(start * np.dtype(dtype).itemsize)
+                columns.append(np.fromfile(f, dtype=dtype, count=count))
+            yield (start, *columns)
+        yield from ((self.spooled + offset, *columns) for offset, *columns in super().chunks())
+
+    def __len__(self):
+        return self.spooled + self.length
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def section_layout(sizes):
+    layout = {}
+    offset = len(MAGIC) + HEADER_SIZE
+    for name, (dtype, count) in sizes.items():
+        offset = (offset + 63) // 64 * 64
+        layout[name] = [offset, np.dtype(dtype).str, int(count)]
+        offset += np.dtype(dtype).itemsize * int(count)
+    return layout, offset
+
+
+def create_file(path, header, sizes):
+    layout, size = section_layout(sizes)
+    header = dict(header, version=1, sections=layout)
+    encoded = json.dumps(header).encode()
+    if len(encoded) > HEADER_SIZE:
+        raise Exception('Error: binary model header too large')
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(encoded.ljust(HEADER_SIZE, b' '))
+        f.truncate(size)
+    return {name: np.memmap(path, dtype=dtype, mode='r+', offset=offset, shape=(count,))
+            for name, (offset, dtype, count) in layout.items()}
+
+
+def encode_names(names):
+    return np.frombuffer('\n'.join(names).encode(), dtype=np.uint8)
+
+
+def decode_names(section):
+    text = bytes(section).decode()
+    return text.split('\n') if text else []
+
+
+def index_dtype(*counts):
+    return np.int32 if max(counts) < 2 ** 31 else np.int64
+
+
+def finish_rows(sections):
+    # probabilities and alias tables, computed from the mapped weights
+    indptr, weights = sections['indptr'], sections['weights']
+    rows = len(indptr) - 1
+    block = 1 << 20
+    for first in range(0, rows, block):
+        last = min(first + block, rows)
+        start, end = indptr[first], indptr[last]
+        row_of_entry = np.repeat(np.arange(last - first), np.diff(indptr[first:last + 1]))
+        totals = np.bincount(row_of_entry, weights=weights[start:end], minlength=last - first)
+        sections['probabilities'][start:end] = weights[start:end] / totals[row_of_entry]
+    sections['alias_probability'][:] = 1.0
+    sections['alias'][:] = 0
+    fill_alias_tables(indptr, weights, sections['alias_probability'], sections['alias'])
+    for section in sections.values():
+        section.flush()
+
+
+def merge_rows(indptr, indices, weights, n, chunk_size):
+    # sorts every row by target and sums the weights of duplicate targets, in
+    # place, about chunk_size entries at a time; returns the new row lengths
+    rows = len(indptr) - 1
+    counts = np.zeros(rows, dtype=np.int64)
+    written = 0
+    first = 0
+    while first < rows:
+        last = int(np.searchsorted(indptr, indptr[first] + chunk_size, side='right')) - 1
+        last = min(max(last, first + 1), rows)
+        start, end = int(indptr[first]), int(indptr[last])
+        if end > start:
+            row = np.repeat(np.arange(first, last, dtype=np.int64), np.diff(indptr[first:last + 1]))
+            keys = row * n + indices[start:end]
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            unique = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            merged = np.add.reduceat(np.asarray(weights[start:end])[order], unique)
+            keys = keys[unique]
+            # written never passes start: the block is read before anything is written over it
+            indices[written:written + len(keys)] = keys % n
+            weights[written:written + len(keys)] = merged
+            counts[first:last] = np.bincount(keys // n - first, minlength=last - first)
+            written += len(keys)
+        first = last
+    return counts
+
+
+def write_rewards(sections, states, state_rewards):
+    sections['rewards'][:] = [state_rewards.get(state, 0) for state in states]
+    sections['rewarded'][:] = [state in state_rewards for state in states]
+
+
+def save_model(model, path):
+    compiled = model.compiled
+    states, actions = compiled.states, compiled.actions
+    entries, rows = len(compiled.indices), len(compiled.indptr) - 1
+    index = index_dtype(entries, rows, len(states))
+    sizes = {
+        'indptr': (index, rows + 1),
+        'indices': (index, entries),
+        'weights': (np.int64, entries),
+        'probabilities': (np.float64, entries),
+        'alias_probability': (np.float64, entries),
+        'alias': (np.int32, entries),
+        'rewards': (np.int64, len(states)),
+        'rewarded': (np.bool_, len(states)),
+        'state_names': (np.uint8, len(encode_names(states))),
+        'action_names': (np.uint8, len(encode_names(actions))),
+    }
+    if compiled.choice_offsets is not None:
+        sizes['choice_offsets'] = (np.int64, len(states) + 1)
+        sizes['choice_actions'] = (np.int32, rows)
+    header = {'kind': 'MC' if compiled.choice_offsets is None else 'MDP', 'has_rewards': bool(model.state_rewards)}
+    sections = create_file(path, header, sizes)
+    sections['indptr'][:] = compiled.indptr
+    sections['indices'][:] = compiled.indices
+    sections['weights'][:] = compiled.weights
+    sections['probabilities'][:] = compiled.probabilities
+    sections['alias_probability'][:] = compiled.alias_probability
+    sections['alias'][:] = compiled.alias
+    write_rewards(sections, states, model.state_rewards)
+    sections['state_names'][:] = encode_names(states)
+    sections['action_names'][:] = encode_names(actions)
+    if compiled.choice_offsets is not None:
+        sections['choice_offsets'][:] = compiled.choice_offsets
+        sections['choice_actions'][:] = compiled.choice_actions
+    for section in sections.values():
+        section.flush()
+
+
+def convert(source_filename, path, chunk_size=1 << 20):
+    # parse into a spooled store, validate it chunk by chunk, then scatter the
+    # transitions into spooled CSR arrays, merged row by row into the mapped ones
+    directory = os.path.dirname(os.path.abspath(path))
+    store = SpooledTransitionStore(directory, chunk_size)
+    try:
+        temp_model = TemporaryModel(store)
+        with open(source_filename) as f:
+            loader.read_model(f, temp_model)
+        kind = temp_model.verify_model()
+        states = temp_model.states
+        n = len(states)
+        if kind == 'MDP':
+            actions = temp_model.actions + ['no_action']
+            no_action = len(actions) - 1
+            has_choice = np.zeros((n, len(actions)), dtype=bool)
+            for _, source, _, action, _, _ in store.chunks():
+                has_choice[source, np.where(action < 0, no_action, action)] = True
+            choice_offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(has_choice.sum(axis=1), out=choice_offsets[1:])
+            choice_of = (choice_offsets[:-1, None] + np.cumsum(has_choice, axis=1) - 1)
+            rows = int(choice_offsets[-1])
+            row_of = lambda source, action: choice_of[source, np.where(action < 0, no_action, action)]
+        else:
+            actions = []
+            rows = n
+            row_of = lambda source, action: source
+
+        counts = np.zeros(rows, dtype=np.int64)
+        for _, source, _, action, _, _ in store.chunks():
+            counts += np.bincount(row_of(source, action), minlength=rows)
+
+        # scatter the transitions into spooled CSR arrays, then sort the rows and merge the duplicate edges
+        indptr = np.zeros(rows + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        spooled = {name: np.memmap(tempfile.TemporaryFile(dir=directory), dtype=dtype, mode='w+',
+                                   shape=(max(int(indptr[-1]), 1),))
+                   for name, dtype in (('indices', np.int32), ('weights', np.int64))}
+        position = indptr[:-1].copy()
+        for _, source, target, action, weight, _ in store.chunks():
+            row = row_of(source, action)
+            order = np.argsort(row, kind='stable')
+            row = row[order]
+            group_start = np.searchsorted(row, row, side='left')
+            destination = position[row] + (np.arange(len(row)) - group_start)
+            spooled['indices'][destination] = target[order]
+            spooled['weights'][destination] = weight[order]
+            position += np.bincount(row, minlength=rows)
+        counts = merge_rows(indptr, spooled['indices'], spooled['weights'], n, chunk_size)
+        entries = int(counts.sum())
+        index = index_dtype(entries, rows, n)
+
+        sizes = {
+            'indptr': (index, rows + 1),
+            'indices': (index, entries),
+            'weights': (np.int64, entries),
+            'probabilities': (np.float64, entries),
+            'alias_probability': (np.float64, entries),
+            'alias': (np.int32, entries),
+            'rewards': (np.int64, n),
+            'rewarded': (np.bool_, n),
+            'state_names': (np.uint8, len(encode_names(states))),
+            'action_names': (np.uint8, len(encode_names(actions))),
+        }
+        if kind == 'MDP':
+            sizes['choice_offsets'] = (np.int64, n + 1)
+            sizes['choice_actions'] = (np.int32, rows)
+        sections = create_file(path, {'kind': kind, 'has_rewards': bool(temp_model.state_rewards)}, sizes)
+
+        sections['indptr'][0] = 0
+        np.cumsum(counts, out=sections['indptr'][1:])
+        for start in range(0, entries, chunk_size):
+            end = min(start + chunk_size, entries)
+            sections['indices'][start:end] = spooled['indices'][start:end]
+            sections['weights'][start:end] = spooled['weights'][start:end]
+        del spooled
+
+        write_rewards(sections, states, temp_model.state_rewards)
+        sections['state_names'][:] = encode_names(states)
+        sections['action_names'][:] = encode_names(actions)
+        if kind == 'MDP':
+            sections['choice_offsets'][:] = choice_offsets
+            choice_actions = np.nonzero(has_choice)[1]
+            sections['choice_actions'][:] = choice_actions
+        finish_rows(sections)
+    finally:
+        store.close()
+
+
+def open_model(path, seed=None):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise Exception(f'Error: {path} is not a binary model file')
+        header = json.loads(f.read(HEADER_SIZE))
+    sections = {name: np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+                for name, (offset, dtype, count) in header['sections'].items()}
+    states = decode_names(sections['state_names'])
+    compiled = CompiledModel(
+        states,
+        decode_names(sections['action_names']),
+        sections['indptr'],
+        sections['indices'],
+        sections['weights'],
+        sections.get('choice_offsets'),
+        sections.get('choice_actions'),
+        sections['alias_probability'],
+        sections['alias'],
+        sections['probabilities'])
+    rewards = {}
+    if header['has_rewards']:
+        # files without the rewarded section predate it and gave every state a reward
+        rewarded = sections['rewarded'] if 'rewarded' in sections else np.ones(len(states), dtype=bool)
+        rewards = {states[i]: reward for i, reward in zip(np.flatnonzero(rewarded).tolist(),
+                                                          sections['rewards'][rewarded].tolist())}
+    model_class = MarkovDecisionProcess if header['kind'] == 'MDP' else MarkovChain
+    return model_class.from_compiled(compiled, rewards, seed=seed)
+
+
+if __name__ == '__main__':
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,91 @@
+import os
+import shutil
+import numpy as np
+import pytest
+import cache
+import loader
+from test_loaders import MODELS, assert_same_model
+
+
+def copy_model(tmp_path, name):
+    path = str(tmp_path / name)
+    shutil.copy(os.path.join(MODELS, name), path)
+    return path
+
+
+def counting_loader(calls):
+    def load(filename):
+        calls.append(filename)
+        return loader.load_temporary_model(filename)
+    return load
+
+
+def cached_files(path):
+    directory = os.path.join(os.path.dirname(path), cache.CACHE_DIRECTORY)
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+@pytest.mark.parametrize('name', ['families.mdp', 'dice_reward.mdp', 'ex_mdprew.mdp', 'dice.mdp'])
+def test_hit_gives_the_parsed_model(tmp_path, name):
+    path = copy_model(tmp_path, name)
+    calls = []
+    first = cache.load_model(path, counting_loader(calls))
+    second = cache.load_model(path, counting_loader(calls))
+    assert calls == [path]
+    assert_same_model(second, first)
+    assert_same_model(second, loader.load_model(path))
+
+
+def test_families_rewards_survive_the_cache(tmp_path):
+    path = copy_model(tmp_path, 'families.mdp')
+    cache.load_model(path)
+    rewards = cache.load_model(path).state_rewards
+    assert len(rewards) == 11 and 'R_1' not in rewards and rewards['Q_10'] == 1
+
+
+def test_miss_on_a_changed_source(tmp_path):
+    path = copy_model(tmp_path, 'dice.mdp')
+    calls = []
+    cache.load_model(path, counting_loader(calls))
+    [stale] = cached_files(path)
+    with open(path, 'a') as f:
+        f.write('F1 -> 1:F1;\n')
+    model = cache.load_model(path, counting_loader(calls))
+    assert calls == [path, path]
+    assert model.transition_matrix[model.state_ids['F1'], model.state_ids['F1']] == 1
+    assert cached_files(path) != [stale] and len(cached_files(path)) == 1
+    cache.load_model(path, counting_loader(calls))
+    assert len(calls) == 2
+
+
+def test_invalid_entry_is_rebuilt(tmp_path):
+    path = copy_model(tmp_path, 'dice.mdp')
+    calls = []
+    cache.load_model(path, counting_loader(calls))
+    [entry] = cached_files(path)
+    entry = os.path.join(os.path.dirname(path), cache.CACHE_DIRECTORY, entry)
+    with np.load(entry) as data:
+        arrays = dict(data)
+    arrays['format_version'] = np.array(cache.FORMAT_VERSION - 1)
+    np.savez(entry, **arrays)
+    cache.load_model(path, counting_loader(calls))
+    with open(entry, 'wb') as f:
+        f.write(b'not an archive')
+    assert_same_model(cache.load_model(path, counting_loader(calls)), loader.load_model(path))
+    assert calls == [path, path, path]
+
+
+def test_remove_stale_keeps_files_being_written(tmp_path):
+    path = copy_model(tmp_path, 'dice.mdp')
+    directory = os.path.join(os.path.dirname(path), cache.CACHE_DIRECTORY)
+    os.makedirs(directory)
+    writing = os.path.join(directory, 'dice.mdp.0123456789abcdef.v2.npz.4242.tmp.npz')
+    stale = os.path.join(directory, 'dice.mdp.0123456789abcdef.v1.npz')
+    other = os.path.join(directory, 'other.mdp.0123456789abcdef.v2.npz')
+    for name in (writing, stale, other):
+        open(name, 'w').close()
+    cache.load_model(path)
+    files = cached_files(path)
+    assert os.path.basename(writing) in files and os.path.basename(other) in files
+    assert os.path.basename(stale) not in files
+    assert len(files) == 3
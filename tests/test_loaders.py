@@ -0,0 +1,104 @@
+import os
+import numpy as np
+import pytest
+import antlr_loader
+import loader
+
+MODELS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+LOADERS = (loader, antlr_loader)
+
+
+def assert_same_model(first, second):
+    a, b = first.compiled, second.compiled
+    assert a.states == b.states
+    assert a.actions == b.actions
+    for name in ('indptr', 'indices', 'weights'):
+        assert np.array_equal(getattr(a, name), getattr(b, name)), name
+    if a.choice_offsets is None:
+        assert b.choice_offsets is None
+    else:
+        assert np.array_equal(a.choice_offsets, b.choice_offsets)
+        assert np.array_equal(a.choice_actions, b.choice_actions)
+    assert first.state_rewards == second.state_rewards
+
+
+def test_families_and_templates():
+    path = os.path.join(MODELS, 'families.mdp')
+    model = loader.load_temporary_model(path).generate_model()
+    assert_same_model(model, antlr_loader.load_temporary_model(path).generate_model())
+    assert len(model.states) == 16
+    assert model.state_rewards['Q_10'] == 1
+
+
+@pytest.mark.parametrize('name', sorted(f for f in os.listdir(MODELS) if f.endswith('.mdp')))
+def test_loaders_agree(name):
+    path = os.path.join(MODELS, name)
+    assert_same_model(loader.load_temporary_model(path).generate_model(),
+                      antlr_loader.load_temporary_model(path).generate_model())
+
+
+@pytest.mark.parametrize('module', LOADERS, ids=lambda module: module.__name__)
+@pytest.mark.parametrize('name, message', [
+    ('undeclared_state', 'Error: undeclared state: S9 (line 2)'),
+    ('undeclared_action', 'Error: undeclared action: z (line 3)'),
+    ('mixed_transitions', 'Error: transitions with and without actions leaving state S0 (line 4)'),
+])
+def test_loader_errors(module, name, message):
+    with pytest.raises(Exception) as error:
+        module.load_temporary_model(os.path.join(FIXTURES, f'{name}.mdp')).generate_model()
+    assert str(error.value) == message
+
+
+def write_shards(directory, files):
+    for name, text in files.items():
+        (directory / name).write_text(text)
+    return str(directory)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_shards_match_the_whole_file(tmp_path, workers):
+    with open(os.path.join(MODELS, 'families.mdp')) as f:
+        lines = f.read().splitlines()
+    directory = write_shards(tmp_path, {'0_header.mdp': '\n'.join(lines[:3]), '1_part.mdp': '\n'.join(lines[3:5]),
+                                        '2_part.mdp': '\n'.join(lines[5:]), 'notes.txt': 'ignored'})
+    assert_same_model(loader.load_shards([directory], workers=workers).generate_model(),
+                      loader.load_model(os.path.join(MODELS, 'families.mdp')))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_shard_errors_name_the_file(tmp_path, workers):
+    directory = write_shards(tmp_path, {
+        'header.mdp': 'States A, B, C;\nActions a;\nA [a] -> 1:B;\n',
+        'part1.mdp': 'B -> 1:C;\nC -> 1:X;\n',
+        'part2.mdp': 'A [a] -> 1:B + 1:C;\nB -> 1:A;\nC [z] -> 1:A;\n',
+    })
+    part1, part2 = (os.path.join(directory, name) for name in ('part1.mdp', 'part2.mdp'))
+    with pytest.raises(Exception) as error:
+        loader.load_shards([directory], workers=workers)
+    assert str(error.value).splitlines() == [f'Error: {part1}: undeclared state: X (line 2)',
+                                             f'Error: {part2}: undeclared action: z (line 3)']
+
+    (tmp_path / 'part1.mdp').write_text('B -> 1:C;\n')
+    (tmp_path / 'part2.mdp').write_text('C -> 1:A;\nA [a] -> 1:B + 1:C;\nB -> 2:C;\n')
+    with pytest.raises(Exception) as error:
+        loader.load_shards([directory], workers=workers)
+    assert str(error.value).splitlines() == [
+        f'Error: duplicate transition A [a] -> B in {os.path.join(directory, "header.mdp")} (line 3) and {part2} (line 2)',
+        f'Error: duplicate transition B -> C in {part1} (line 1) and {part2} (line 3)']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_errors_after_the_merge_name_the_shard(tmp_path, workers):
+    directory = write_shards(tmp_path, {
+        'header.mdp': 'States A, B;\nActions a;\n',
+        'part1.mdp': 'A [a] -> 1:B;\nB [a] -> 1:A;\n',
+        'part2.mdp': 'B -> 1:B;\n\nA -> 1:A;\n',
+    })
+    model = loader.load_shards([directory], workers=workers)
+    with pytest.raises(Exception) as error:
+        model.generate_model()
+    part2 = os.path.join(directory, 'part2.mdp')
+    assert str(error.value).splitlines() == [
+        f'Error: {part2}: transitions with and without actions leaving state B (line 1)',
+        f'Error: {part2}: transitions with and without actions leaving state A (line 3)']
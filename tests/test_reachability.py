@@ -0,0 +1,163 @@
+import os
+import random
+import numpy as np
+import pytest
+import loader
+import precomputation
+from models import MarkovDecisionProcess, TemporaryModel
+from precomputation import prob0, prob1
+from solvers import interval_iteration, policy_iteration, value_iteration
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SEEDS = range(60)
+
+
+def random_model(seed, mdp):
+    # a few successors per choice, some of them of weight 0, and deadlock states
+    r = random.Random(seed)
+    states = [f'S{i}' for i in range(r.randint(2, 15))]
+    actions = ['a', 'b', 'c'] if mdp else []
+    model = TemporaryModel()
+    model.add_states(states)
+    model.add_actions(actions)
+    for i, state in enumerate(states):
+        if i > 0 and r.random() < 0.15:
+            continue
+        for action in (r.sample(actions, r.randint(1, 3)) if mdp else [None]):
+            targets = r.sample(states, r.randint(1, min(3, len(states))))
+            weights = [r.randint(0, 3) for _ in targets]
+            weights[0] = max(weights[0], 1)
+            model.add_transitions(state, action, targets, weights)
+    return model.generate_model()
+
+
+def targets_of(seed):
+    return [0] if seed % 3 else [0, 1]
+
+
+def reference_values(model, targets, minimum=False, iterations=5000):
+    # reference values, from below
+    compiled = model.compiled
+    matrix = compiled.transition_matrix.toarray()
+    x = np.zeros(len(compiled.states))
+    x[targets] = 1
+    for _ in range(iterations):
+        x = matrix @ x
+        if compiled.choice_offsets is not None:
+            reduce = np.minimum.reduceat if minimum else np.maximum.reduceat
+            x = reduce(x, compiled.choice_offsets[:-1])
+        x[targets] = 1
+    return x
+
+
+def end_component():
+    return loader.load_temporary_model(os.path.join(FIXTURES, 'end_component.mdp')).generate_model()
+
+
+@pytest.mark.parametrize('mdp', [False, True], ids=['MC', 'MDP'])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_prob0_prob1(seed, mdp):
+    model = random_model(seed, mdp)
+    targets = targets_of(seed)
+    for minimum in ((False, True) if mdp else (False,)):
+        x = reference_values(model, targets, minimum)
+        zero = prob0(model.compiled, targets, minimum)
+        assert np.array_equal(zero, x == 0)
+        assert np.array_equal(prob1(model.compiled, targets, minimum, zero), x > 1 - 1e-9)
+        assert np.array_equal(prob1(model.compiled, targets, minimum), x > 1 - 1e-9)
+
+
+def test_end_component_graph_analysis():
+    model = end_component()
+    compiled = model.compiled
+    targets = model.target_indices('T')
+    assert isinstance(model, MarkovDecisionProcess)
+    # the loop between S0 and S1 avoids T forever under Pmin
+    assert prob0(compiled, targets, minimum=True).tolist() == [True, True, False, True]
+    assert prob0(compiled, targets).tolist() == [False, False, False, True]
+    assert prob1(compiled, targets).tolist() == [False, False, True, False]
+
+
+@pytest.mark.parametrize('mdp', [False, True], ids=['MC', 'MDP'])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_interval_iteration(seed, mdp):
+    model = random_model(seed, mdp)
+    targets = targets_of(seed)
+    for minimum in ((False, True) if mdp else (False,)):
+        x = reference_values(model, targets, minimum)
+        lower, upper, report = interval_iteration(model.compiled, targets, minimum, epsilon=1e-8)
+        assert report['converged']
+        assert (upper - lower).max() < 1e-8
+        assert (lower <= x + 1e-9).all() and (upper >= x - 1e-9).all()
+
+
+def test_interval_iteration_end_component():
+    model = end_component()
+    bounds, report = model.solve_property_interval('T', epsilon=1e-9)
+    assert report['converged']
+    # without deflation the upper bound of S0 and S1 would stay at 1
+    assert bounds['S0'] == pytest.approx((0.5, 0.5)) and bounds['S1'] == pytest.approx((0.5, 0.5))
+    bounds, report = model.solve_property_interval('T', epsilon=1e-9, minimum=True)
+    assert bounds['S0'] == (0.0, 0.0) and bounds['T'] == (1.0, 1.0)
+
+
+def test_interval_iteration_markov_chain():
+    model = random_model(0, False)
+    exact = model.verify_property_linear_system('S0')
+    bounds, _ = model.solve_property_interval('S0', epsilon=1e-10)
+    for state, (low, high) in bounds.items():
+        assert low - 1e-9 <= exact[state] <= high + 1e-9
+
+
+def scheduler_values(model, scheduler, targets, iterations=5000):
+    # reachability in the Markov chain that the scheduler induces
+    matrix = model.compiled.transition_matrix[scheduler].toarray()
+    x = np.zeros(len(model.states))
+    x[targets] = 1
+    for _ in range(iterations):
+        x = matrix @ x
+        x[targets] = 1
+    return x
+
+
+@pytest.mark.parametrize('minimum', [False, True], ids=['max', 'min'])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_optimal_schedulers(seed, minimum):
+    model = random_model(seed, True)
+    targets = targets_of(seed)
+    x = reference_values(model, targets, minimum)
+    property = ','.join(model.states[t] for t in targets)
+    linear = model.verify_property_linear(property, minimum)
+    assert np.allclose(list(linear.values()), x, atol=1e-6)
+    for solve in (value_iteration, policy_iteration):
+        values, scheduler, report = solve(model.compiled, targets, minimum) if solve is policy_iteration \
+            else solve(model.compiled, targets, minimum, epsilon=1e-10)
+        assert report['converged']
+        assert np.allclose(values, x, atol=1e-6)
+        assert np.array_equal(model.compiled.choice_states()[scheduler], np.arange(len(model.states)))
+        assert np.allclose(scheduler_values(model, scheduler, targets), x, atol=1e-6)
+
+
+@pytest.mark.parametrize('method', ['value', 'policy'])
+def test_end_component_scheduler(method):
+    model = end_component()
+    probabilities, scheduler, _ = model.solve_property_optimal('T', method)
+    # a looks as good as b in S0, but only b ever reaches T
+    assert probabilities['S0'] == pytest.approx(0.5) and scheduler['S0'] == 'b'
+    probabilities, scheduler, _ = model.solve_property_optimal('T', method, minimum=True)
+    assert probabilities['S0'] == 0.0 and scheduler['S0'] == 'a'
+    assert model.verify_property_linear('T') == pytest.approx({'S0': 0.5, 'S1': 0.5, 'T': 1.0, 'F': 0.0})
+    assert model.verify_property_linear('T', minimum=True) == pytest.approx({'S0': 0.0, 'S1': 0.0, 'T': 1.0, 'F': 0.0})
+
+
+@pytest.mark.parametrize('mdp', [False, True], ids=['MC', 'MDP'])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_small_and_large_graph_searches_agree(seed, mdp, monkeypatch):
+    model = random_model(seed, mdp)
+    targets = targets_of(seed)
+    for minimum in ((False, True) if mdp else (False,)):
+        small = prob0(model.compiled, targets, minimum), prob1(model.compiled, targets, minimum)
+        monkeypatch.setattr(precomputation, 'SMALL_GRAPH', 0)
+        large = prob0(model.compiled, targets, minimum), prob1(model.compiled, targets, minimum)
+        monkeypatch.undo()
+        assert np.array_equal(small[0], large[0]) and np.array_equal(small[1], large[1])
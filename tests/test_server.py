@@ -0,0 +1,95 @@
+import asyncio
+import json
+import http.client
+import os
+import socket
+import threading
+import time
+import pytest
+from server import Client, ModelServer
+
+MODELS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+DICE = os.path.join(MODELS, 'dice.mdp')
+
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = str(tmp_path / 'server.sock')
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    model_server = ModelServer(workers=2, no_cache=True)
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(model_server.serve(socket_path, port=port))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+    yield model_server, socket_path, port
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture(params=['socket', 'http'])
+def client(request, server):
+    _, socket_path, port = server
+    with (Client(socket_path=socket_path, timeout=30) if request.param == 'socket' else Client(port=port, timeout=30)) as client:
+        yield client
+
+
+def test_reachability_reuses_the_factorization(server, client):
+    model_server = server[0]
+    first = client.check(DICE, 'F1')
+    assert first['I'] == pytest.approx(1 / 6)
+    entry = model_server.registry.models[os.path.realpath(DICE)].result()
+    factorization = entry.factorizations['F1']
+    assert client.check(DICE, 'F1', initial='I') == pytest.approx(1 / 6)
+    assert client.check(DICE, 'F1') == first
+    assert entry.factorizations['F1'] is factorization
+    [description] = client.request('models')
+    assert description['factorizations'] == ['F1'] and description['queries'] == 3
+
+
+def test_other_techniques(client):
+    result = client.check(DICE, 'F1', technique='interval', initial='I', tolerance=1e-9)
+    assert result['interval'][0] <= 1 / 6 <= result['interval'][1]
+    assert client.check(DICE, 'F1', technique='smc', seed=1) == client.check(DICE, 'F1', technique='smc', seed=1)
+
+
+def test_errors(client):
+    with pytest.raises(Exception, match="Error: state 'NOPE' not declared"):
+        client.check(DICE, 'NOPE')
+    with pytest.raises(Exception, match='Error: unknown command explode'):
+        client.request('explode')
+    with pytest.raises(Exception, match='No such file'):
+        client.load(os.path.join(MODELS, 'missing.mdp'))
+    # the connection and the server survive the errors
+    assert client.request('ping') == 'pong'
+
+
+def test_http_bad_requests(server):
+    _, _, port = server
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request('POST', '/', '{not json', {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    assert response.status == 400 and json.loads(response.read())['ok'] is False
+    connection.close()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request('GET', '/nothing')
+    assert connection.getresponse().status == 404
+    connection.close()
@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import loader
+from models import MarkovChain, TemporaryModel, fill_alias_tables
+from simulation import biased_weights
+
+MODELS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+
+def test_smc_seed_reproducible_for_any_workers():
+    model = loader.load_model(os.path.join(MODELS, 'dice.mdp'))
+    model.simulation_trace = False
+    results = {model.verify_property_smc_quant('F1', 0.01, 0.01, workers=workers, seed=42) for workers in (None, 1, 2)}
+    assert len(results) == 1
+
+
+def alias_distributions(indptr, weights):
+    alias_probability = np.ones(len(weights))
+    alias = np.zeros(len(weights), dtype=np.int32)
+    fill_alias_tables(indptr, weights, alias_probability, alias)
+    assert np.all((alias_probability >= 0) & (alias_probability <= 1))
+    for start, end in zip(indptr[:-1], indptr[1:]):
+        # each entry is drawn with 1/degree, then kept or sent to its alias
+        mass = alias_probability[start:end].copy()
+        np.add.at(mass, alias[start:end], 1 - alias_probability[start:end])
+        yield mass / (end - start), weights[start:end] / weights[start:end].sum()
+
+
+def test_alias_tables_give_the_row_distributions():
+    rng = np.random.default_rng(3)
+    # rows with a heavy of no excess first, several heavies, one light filled across heavies
+    rows = [[2, 1, 3], [1, 1, 2, 5, 1, 2], [3, 1, 2], [7], [2, 2], [1, 9, 1, 1, 9, 3, 1, 1]]
+    rows += [rng.integers(1, 6, size=rng.integers(1, 9)).tolist() for _ in range(500)] + [[4, 4, 4], [5]]
+    indptr = np.concatenate(([0], np.cumsum([len(row) for row in rows])))
+    weights = np.concatenate(rows).astype(np.int64)
+    for found, expected in alias_distributions(indptr, weights):
+        assert np.allclose(found, expected, rtol=0, atol=1e-15)
+    for found, expected in alias_distributions(indptr, weights * rng.random(len(weights)) + 0.1):
+        assert np.allclose(found, expected, rtol=0, atol=1e-12)
+    # only uniform and one-successor rows
+    for found, expected in alias_distributions(np.array([0, 2, 3, 6]), np.array([3, 3, 1, 2, 2, 2])):
+        assert np.array_equal(found, expected)
+
+
+def test_biased_weights_only_push_towards_the_targets():
+    model = TemporaryModel()
+    model.add_states(['S0', 'S1', 'T', 'F'])
+    model.add_transitions('S0', None, ['S1', 'F'], [1, 4])
+    model.add_transitions('S1', None, ['T', 'F'], [4, 1])
+    model.add_transitions('T', None, ['T'], [1])
+    model.add_transitions('F', None, ['F'], [1])
+    compiled = model.generate_model().compiled
+    weights = biased_weights(compiled, [compiled.state_ids['T']], bias=0.5)
+    # S0 reaches S1 with 0.2, raised to 0.5; S1 already reaches T with 0.8
+    assert np.allclose(weights[:4], [0.5, 0.5, 0.8, 0.2])
+
+
+def test_trace_file_keeps_every_trace(tmp_path):
+    compiled = loader.load_model(os.path.join(MODELS, 'dice.mdp')).compiled
+    trace_file = str(tmp_path / 'paths.trace')
+    model = MarkovChain.from_compiled(compiled, seed=1, trace_file=trace_file)
+    model.simulation_trace = False
+    model.recorder.buffer = model.recorder.buffer[:2]    # flushes to the file every two steps
+    paths = []
+    for _ in range(3):
+        model.simulation_init()
+        paths.append([model.actual_state] + [model.simulation_step() for _ in range(4)])
+        assert list(model.path) == paths[-1]
+    assert [[model.states[s] for s in model.recorder.trace_records(k)[:, 0]] for k in range(3)] == paths
+
+
+def test_seeded_smc_of_two_models_at_once():
+    dice = loader.load_model(os.path.join(MODELS, 'dice.mdp'))
+    chain = loader.load_model(os.path.join(MODELS, 'mc.mdp'))
+    queries = [(dice, 'F1'), (chain, 'S2')] * 4
+    expected = [model.verify_property_smc_quant(target, 0.01, 0.01, seed=1) for model, target in queries]
+    # as in the server: a thread per query, no lock shared between models
+    with ThreadPoolExecutor(len(queries)) as executor:
+        results = list(executor.map(lambda query: query[0].verify_property_smc_quant(query[1], 0.01, 0.01, seed=1), queries))
+    assert results == expected
+
+
+def test_workers_from_a_threaded_process():
+    dice = loader.load_model(os.path.join(MODELS, 'dice.mdp'))
+    expected = dice.verify_property_smc_quant('F1', 0.005, 0.01, seed=3)
+    with ThreadPoolExecutor(1) as executor:
+        assert executor.submit(dice.verify_property_smc_quant, 'F1', 0.005, 0.01, 20, 2, 3).result() == expected
+
+
+def seeded_dice(seed):
+    return MarkovChain.from_compiled(loader.load_model(os.path.join(MODELS, 'dice.mdp')).compiled, seed=seed)
+
+
+def test_sprt_verdict_on_each_side_of_theta():
+    # the probability of F1 is 1/6: 1 when below theta, 0 when above
+    for seed in (1, 2, 3):
+        assert seeded_dice(seed).verify_property_smc_qual('F1', 0.25, 0.02)[0] == 1
+        assert seeded_dice(seed).verify_property_smc_qual('F1', 0.1, 0.02)[0] == 0
+
+
+def test_sprt_tight_indifference_region_finishes():
+    # the likelihoods of tens of thousands of samples underflow, their log ratio does not
+    for theta, answer in ((0.17, 1), (0.16, 0)):
+        result, samples = seeded_dice(1).verify_property_smc_qual('F1', theta, 0.001, max_simulations=10 ** 6)
+        assert result == answer and 10000 < samples < 10 ** 6
+
+
+def test_sprt_returns_the_samples_drawn():
+    result, samples = seeded_dice(1).verify_property_smc_qual('F1', 0.25, 0.02)
+    assert type(samples) is int and samples > 0
+    assert seeded_dice(1).verify_property_smc_qual('F1', 0.25, 0.02) == (result, samples)
+    assert seeded_dice(1).verify_property_smc_qual('F1', 0.17, 0.001, max_simulations=500) == (-1, 500)
+
+
+def n_max(epsilon, delta):
+    return int(np.ceil(np.log(4 / delta) / (2 * epsilon ** 2)))
+
+
+def test_adaptive_interval_contains_the_probability():
+    for seed in (1, 2, 3):
+        probability, (low, high), samples = seeded_dice(seed).verify_property_smc_adaptive('F1', 0.03, 0.01, 100)
+        # a Clopper-Pearson interval, found before the Hoeffding cap
+        assert samples < n_max(0.03, 0.01)
+        assert low <= 1 / 6 <= high and high - low <= 2 * 0.03
+        assert low <= probability <= high
+
+
+def test_adaptive_stops_early_near_0_and_1():
+    for property, steps, probability in (('F1,F2,F3,F4,F5,F6', 100, 1.0), ('F1', 2, 0.0)):
+        estimate, (low, high), samples = seeded_dice(1).verify_property_smc_adaptive(property, 0.01, 0.01, steps)
+        assert estimate == probability and low <= probability <= high
+        assert samples < n_max(0.01, 0.01) // 10
+    # at 1/6 the same precision needs the cap, with the Hoeffding interval
+    estimate, (low, high), samples = seeded_dice(1).verify_property_smc_adaptive('F1', 0.01, 0.01, 100)
+    assert samples == n_max(0.01, 0.01) == 29958
+    assert (low, high) == (estimate - 0.01, estimate + 0.01) and low <= 1 / 6 <= high
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from solvers import solve_iterative
+from test_reachability import random_model
+
+# I - A of a small chain on which over-relaxation with omega = 1.3 diverges
+MATRIX = sparse.csr_matrix(np.eye(3) - np.array([[0.68, 0.32, 0.0], [0.0, 0.52, 0.47], [0.82, 0.17, 0.0]]))
+B = np.array([0.0, 0.01, 0.01])
+
+
+@pytest.mark.parametrize('method', ['jacobi', 'gauss-seidel', 'sor'])
+def test_iterations_converge(method):
+    x, report = solve_iterative(MATRIX, B, method, omega=0.9, epsilon=1e-12, max_iterations=100000)
+    assert report['converged']
+    assert np.allclose(x, np.linalg.solve(MATRIX.toarray(), B))
+
+
+def test_divergence_is_an_error():
+    with pytest.raises(Exception, match='Error: sor diverged after'):
+        solve_iterative(MATRIX, B, 'sor', omega=1.3, max_iterations=100000)
+
+
+@pytest.mark.parametrize('method', ['jacobi', 'gauss-seidel', 'sor'])
+@pytest.mark.parametrize('seed', range(20))
+def test_model_iterations_match_the_linear_solve(seed, method):
+    model = random_model(seed, False)
+    exact = model.verify_property_linear_system('S0')
+    probabilities, report = model.solve_property_iterative('S0', 1e-12, 100000, method, omega=1.1)
+    assert report['converged'] and report['residual'] < 1e-9
+    assert probabilities == pytest.approx(exact, abs=1e-8)
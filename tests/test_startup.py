@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_decided_query_skips_the_solver_imports():
+    # every state of mc.mdp surely reaches S2: nothing is left to solve
+    code = ('import sys, batch; batch.main(["check", "models/mc.mdp", "--property", "S2", "--no-cache"]); '
+            'print(" ".join(m for m in ("scipy.sparse.csgraph", "scipy.sparse.linalg") if m in sys.modules))')
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    assert output.splitlines()[-1] == ''
@@ -0,0 +1,41 @@
+import os
+import numpy as np
+import pytest
+import loader
+import storage
+from test_loaders import FIXTURES, MODELS, assert_same_model
+
+SOURCES = [os.path.join(MODELS, name) for name in sorted(os.listdir(MODELS)) if name.endswith('.mdp')] + \
+          [os.path.join(FIXTURES, 'duplicate_edges.mdp')]
+
+
+@pytest.mark.parametrize('chunk_size', [1 << 20, 3])
+@pytest.mark.parametrize('source', SOURCES, ids=os.path.basename)
+def test_convert_round_trip(tmp_path, source, chunk_size):
+    path = str(tmp_path / 'model.bin')
+    storage.convert(source, path, chunk_size=chunk_size)
+    converted = storage.open_model(path)
+    loaded = loader.load_model(source)
+    assert type(converted) is type(loaded)
+    assert_same_model(converted, loaded)
+    assert np.array_equal(converted.compiled.probabilities, loaded.compiled.probabilities)
+    assert np.array_equal(converted.transition_matrix.toarray(), loaded.transition_matrix.toarray())
+    assert np.array_equal(converted.compiled.alias, loaded.compiled.alias)
+    assert np.array_equal(converted.compiled.alias_probability, loaded.compiled.alias_probability)
+
+
+@pytest.mark.parametrize('source', SOURCES, ids=os.path.basename)
+def test_save_round_trip(tmp_path, source):
+    path = str(tmp_path / 'model.bin')
+    loaded = loader.load_model(source)
+    storage.save_model(loaded, path)
+    assert_same_model(storage.open_model(path), loaded)
+
+
+def test_duplicate_edges_are_merged(tmp_path):
+    path = str(tmp_path / 'model.bin')
+    storage.convert(os.path.join(FIXTURES, 'duplicate_edges.mdp'), path, chunk_size=2)
+    model = storage.open_model(path)
+    row = model.compiled.choice_offsets[0]
+    assert model.compiled.indices[model.compiled.indptr[row]:model.compiled.indptr[row + 1]].tolist() == [0, 1, 2]
+    assert model.compiled.weights[model.compiled.indptr[row]:model.compiled.indptr[row + 1]].tolist() == [4, 3, 4]